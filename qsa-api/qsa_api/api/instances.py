@@ -5,7 +5,12 @@ from flask import current_app
 from datetime import datetime
 
 from ..utils import logger
-from .utils import log_request
+from .utils import (
+    log_request,
+    INTERNAL_SERVER_ERROR,
+    MONITORING_DISABLED_ERROR,
+    INSTANCE_NOT_FOUND_ERROR,
+)
 
 
 instances = Blueprint("instances", __name__)
@@ -18,7 +23,7 @@ def instances_list():
         monitor = current_app.config["MONITOR"]
 
         if not monitor:
-            return {"error": "QGIS Server monitoring is not activated"}, 415
+            return MONITORING_DISABLED_ERROR
 
         conns = {"servers": []}
         for uid in monitor.conns:
@@ -32,7 +37,7 @@ def instances_list():
         return conns
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @instances.get("/<instance>")
@@ -42,15 +47,15 @@ def instances_metadata(instance):
         monitor = current_app.config["MONITOR"]
 
         if not monitor:
-            return {"error": "QGIS Server monitoring is not activated"}, 415
+            return MONITORING_DISABLED_ERROR
 
         if instance not in monitor.conns:
-            return {"error": "QGIS Server instance is not available"}, 415
+            return INSTANCE_NOT_FOUND_ERROR
 
         return monitor.conns[instance].metadata
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @instances.get("/<instance>/logs")
@@ -60,15 +65,15 @@ def instances_logs(instance):
         monitor = current_app.config["MONITOR"]
 
         if not monitor:
-            return {"error": "QGIS Server monitoring is not activated"}, 415
+            return MONITORING_DISABLED_ERROR
 
         if instance not in monitor.conns:
-            return {"error": "QGIS Server instance is not available"}, 415
+            return INSTANCE_NOT_FOUND_ERROR
 
         return monitor.conns[instance].logs
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @instances.get("/<instance>/stats")
@@ -78,12 +83,12 @@ def instances_stats(instance):
         monitor = current_app.config["MONITOR"]
 
         if not monitor:
-            return {"error": "QGIS Server monitoring is not activated"}, 415
+            return MONITORING_DISABLED_ERROR
 
         if instance not in monitor.conns:
-            return {"error": "QGIS Server instance is not available"}, 415
+            return INSTANCE_NOT_FOUND_ERROR
 
         return monitor.conns[instance].stats
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
@@ -1,10 +1,13 @@
 # coding: utf8
 
-import shutil
+import re
 import requests
-from jsonschema import validate
-from jsonschema.exceptions import ValidationError
-from flask import send_file, Blueprint, jsonify, request
+import fastjsonschema
+from datetime import datetime as pydatetime
+from urllib3.util.retry import Retry
+from requests.adapters import HTTPAdapter
+from fastjsonschema import JsonSchemaException
+from flask import Response, Blueprint, jsonify, request, stream_with_context
 
 from qgis.PyQt.QtCore import QDateTime
 
@@ -12,11 +15,106 @@ from ..wms import WMS
 from ..utils import logger
 from ..project import QSAProject
 
-from .utils import log_request
+from .utils import (
+    log_request,
+    get_project,
+    true_response,
+    INTERNAL_SERVER_ERROR,
+    PROJECT_NOT_FOUND_ERROR,
+    STYLE_NOT_FOUND_ERROR,
+)
 
 
 projects = Blueprint("projects", __name__)
 
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+DATETIME_RE = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$")
+
+# keep-alive connections to QGIS Server for GetMap requests
+WMS_SESSION = requests.Session()
+WMS_ADAPTER = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=64,
+    max_retries=Retry(
+        total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504]
+    ),
+)
+WMS_SESSION.mount("http://", WMS_ADAPTER)
+WMS_SESSION.mount("https://", WMS_ADAPTER)
+
+ADD_PROJECT_VALIDATOR = fastjsonschema.compile(
+    {
+        "type": "object",
+        "required": ["name", "author"],
+        "properties": {
+            "name": {"type": "string"},
+            "author": {"type": "string"},
+            "schema": {"type": "string"},
+        },
+    }
+)
+
+UPDATE_LAYER_STYLE_VALIDATOR = fastjsonschema.compile(
+    {
+        "type": "object",
+        "required": ["name", "current"],
+        "properties": {
+            "name": {"type": "string"},
+            "current": {"type": "boolean"},
+        },
+    }
+)
+
+ADD_STYLE_VALIDATOR = fastjsonschema.compile(
+    {
+        "type": "object",
+        "required": ["name", "type", "rendering", "symbology"],
+        "properties": {
+            "name": {"type": "string"},
+            "type": {"type": "string"},
+            "symbology": {"type": "object"},
+            "rendering": {"type": "object"},
+        },
+    }
+)
+
+UPDATE_DEFAULT_STYLE_VALIDATOR = fastjsonschema.compile(
+    {
+        "type": "object",
+        "required": ["geometry", "style"],
+        "properties": {
+            "geometry": {"type": "string"},
+            "style": {"type": "string"},
+        },
+    }
+)
+
+ADD_LAYER_VALIDATOR = fastjsonschema.compile(
+    {
+        "type": "object",
+        "required": ["name", "datasource", "type"],
+        "properties": {
+            "name": {"type": "string"},
+            "datasource": {"type": "string"},
+            "crs": {"type": "number"},
+            "type": {"type": "string"},
+            "overview": {"type": "boolean"},
+            "datetime": {"type": "string"},
+        },
+    }
+)
+
+
+BATCH_VALIDATOR = fastjsonschema.compile(
+    {
+        "type": "object",
+        "required": ["items"],
+        "properties": {
+            "items": {"type": "array", "items": {"type": "object"}},
+        },
+    }
+)
+
 
 @projects.get("/")
 def projects_list():
@@ -30,7 +128,7 @@ def projects_list():
         return jsonify(p)
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @projects.get("/<name>")
@@ -38,42 +136,30 @@ def project_info(name: str):
     log_request()
     try:
         psql_schema = request.args.get("schema", default="public")
-        project = QSAProject(name, psql_schema)
+        project = get_project(name, psql_schema)
 
-        if project.exists():
+        if project:
             return jsonify(project.metadata)
-        return {"error": "Project does not exist"}, 415
+        return PROJECT_NOT_FOUND_ERROR
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @projects.post("/")
 def project_add():
     log_request()
     try:
-        schema = {
-            "type": "object",
-            "required": ["name", "author"],
-            "properties": {
-                "name": {"type": "string"},
-                "author": {"type": "string"},
-                "schema": {"type": "string"},
-            },
-        }
-
         if request.is_json:
             data = request.get_json()
             try:
-                validate(data, schema)
-            except ValidationError as e:
+                ADD_PROJECT_VALIDATOR(data)
+            except JsonSchemaException as e:
                 return {"error": e.message}, 415
 
             name = data["name"]
             author = data["author"]
-            schema = ""
-            if "schema" in data:
-                schema = data["schema"]
+            schema = data.get("schema", "")
 
             project = QSAProject(name, schema)
             if project.exists():
@@ -81,11 +167,11 @@ def project_add():
             rc, err = project.create(author)
             if not rc:
                 return {"error": err}, 415
-            return jsonify(True), 201
+            return true_response()
         return {"error": "Request must be JSON"}, 415
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @projects.delete("/<name>")
@@ -93,15 +179,16 @@ def project_del(name):
     log_request()
     try:
         psql_schema = request.args.get("schema", default="public")
-        project = QSAProject(name, psql_schema)
+        project = get_project(name, psql_schema)
 
-        if project.exists():
+        if project:
             project.remove()
-            return jsonify(True), 201
-        return {"error": "Project does not exist"}, 415
+            WMS.clear_cache(name, psql_schema)
+            return true_response()
+        return PROJECT_NOT_FOUND_ERROR
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @projects.get("/<name>/styles")
@@ -109,14 +196,14 @@ def project_styles(name):
     log_request()
     try:
         psql_schema = request.args.get("schema", default="public")
-        project = QSAProject(name, psql_schema)
-        if project.exists():
-            return jsonify(project.styles), 201
+        project = get_project(name, psql_schema)
+        if project:
+            return jsonify(list(project.styles)), 201
         else:
-            return {"error": "Project does not exist"}, 415
+            return PROJECT_NOT_FOUND_ERROR
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @projects.get("/<name>/styles/<style>")
@@ -124,18 +211,18 @@ def project_style(name, style):
     log_request()
     try:
         psql_schema = request.args.get("schema", default="public")
-        project = QSAProject(name, psql_schema)
-        if project.exists():
+        project = get_project(name, psql_schema)
+        if project:
             infos, err = project.style(style)
             if err:
                 return {"error": err}, 415
             else:
                 return jsonify(infos), 201
         else:
-            return {"error": "Project does not exist"}, 415
+            return PROJECT_NOT_FOUND_ERROR
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @projects.delete("/<name>/styles/<style>")
@@ -143,57 +230,45 @@ def project_del_style(name, style):
     log_request()
     try:
         psql_schema = request.args.get("schema", default="public")
-        project = QSAProject(name, psql_schema)
-        if project.exists():
-            if style in project.styles:
+        project = get_project(name, psql_schema)
+        if project:
+            if project.style_exists(style):
                 rc, msg = project.remove_style(style)
                 if not rc:
                     return {"error": msg}, 415
-                return jsonify(rc), 201
+                return true_response()
             else:
-                return {"error": "Style does not exist"}, 415
+                return STYLE_NOT_FOUND_ERROR
         else:
-            return {"error": "Project does not exist"}, 415
+            return PROJECT_NOT_FOUND_ERROR
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @projects.post("/<name>/layers/<layer_name>/style")
 def project_layer_update_style(name, layer_name):
     log_request()
     try:
-        schema = {
-            "type": "object",
-            "required": ["name", "current"],
-            "properties": {
-                "name": {"type": "string"},
-                "current": {"type": "boolean"},
-            },
-        }
+        data = request.get_json()
+        try:
+            UPDATE_LAYER_STYLE_VALIDATOR(data)
+        except JsonSchemaException as e:
+            return {"error": e.message}, 415
 
+        # project existence is checked while reading it
         psql_schema = request.args.get("schema", default="public")
         project = QSAProject(name, psql_schema)
-        if project.exists():
-            data = request.get_json()
-            try:
-                validate(data, schema)
-            except ValidationError as e:
-                return {"error": e.message}, 415
 
-            current = data["current"]
-            style_name = data["name"]
-            rc, msg = project.layer_update_style(
-                layer_name, style_name, current
-            )
-            if not rc:
-                return {"error": msg}, 415
-            return jsonify(True), 201
-        else:
-            return {"error": "Project does not exist"}, 415
+        current = data["current"]
+        style_name = data["name"]
+        rc, msg = project.layer_update_style(layer_name, style_name, current)
+        if not rc:
+            return {"error": msg}, 415
+        return true_response()
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @projects.get("/<name>/layers/<layer_name>/map/url")
@@ -201,15 +276,15 @@ def project_layer_map_url(name, layer_name):
     log_request()
     try:
         psql_schema = request.args.get("schema", default="public")
-        project = QSAProject(name, psql_schema)
-        if project.exists():
+        project = get_project(name, psql_schema)
+        if project:
             getmap = WMS.getmap_url(name, psql_schema, layer_name)
             return jsonify({"url": getmap}), 201
         else:
-            return {"error": "Project does not exist"}, 415
+            return PROJECT_NOT_FOUND_ERROR
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @projects.get("/<name>/layers/<layer_name>/map")
@@ -217,62 +292,78 @@ def project_layer_map(name, layer_name):
     log_request()
     try:
         psql_schema = request.args.get("schema", default="public")
-        project = QSAProject(name, psql_schema)
-        if project.exists():
+        project = get_project(name, psql_schema)
+        if project:
             url = WMS.getmap(name, psql_schema, layer_name)
-            r = requests.get(url, stream=True)
+            r = WMS_SESSION.get(url, stream=True, timeout=(3, 30))
 
-            png = "/tmp/map.png"
-            with open(png, "wb") as out_file:
-                shutil.copyfileobj(r.raw, out_file)
+            headers = {}
+            if "Content-Length" in r.headers:
+                headers["Content-Length"] = r.headers["Content-Length"]
 
-            return send_file(png, mimetype="image/png")
+            return Response(
+                stream_with_context(r.iter_content(chunk_size=64 * 1024)),
+                mimetype="image/png",
+                headers=headers,
+            )
         else:
-            return {"error": "Project does not exist"}, 415
+            return PROJECT_NOT_FOUND_ERROR
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @projects.post("/<name>/styles")
 def project_add_style(name):
     log_request()
     try:
-        schema = {
-            "type": "object",
-            "required": ["name", "type", "rendering", "symbology"],
-            "properties": {
-                "name": {"type": "string"},
-                "type": {"type": "string"},
-                "symbology": {"type": "object"},
-                "rendering": {"type": "object"},
-            },
-        }
+        data = request.get_json()
+        try:
+            ADD_STYLE_VALIDATOR(data)
+        except JsonSchemaException as e:
+            return {"error": e.message}, 415
 
         psql_schema = request.args.get("schema", default="public")
-        project = QSAProject(name, psql_schema)
-        if project.exists():
-            data = request.get_json()
-            try:
-                validate(data, schema)
-            except ValidationError as e:
-                return {"error": e.message}, 415
-
-            rc, err = project.add_style(
-                data["name"],
-                data["type"],
-                data["symbology"],
-                data["rendering"],
-            )
+        project = get_project(name, psql_schema)
+        if project:
+            rc, err = _add_style(project, data)
             if rc:
-                return jsonify(rc), 201
+                return true_response()
             else:
                 return {"error": err}, 415
         else:
-            return {"error": "Project does not exist"}, 415
+            return PROJECT_NOT_FOUND_ERROR
+    except Exception as e:
+        logger().exception(str(e))
+        return INTERNAL_SERVER_ERROR
+
+
+@projects.post("/<name>/styles:batch")
+def project_add_styles(name):
+    log_request()
+    try:
+        data = request.get_json()
+        try:
+            BATCH_VALIDATOR(data)
+            for item in data["items"]:
+                ADD_STYLE_VALIDATOR(item)
+        except JsonSchemaException as e:
+            return {"error": e.message}, 415
+
+        psql_schema = request.args.get("schema", default="public")
+        project = get_project(name, psql_schema)
+        if project:
+            # stop at the first failure, previous styles are kept
+            for item in data["items"]:
+                rc, err = _add_style(project, item)
+                if not rc:
+                    return {"error": err}, 415
+            return true_response()
+        else:
+            return PROJECT_NOT_FOUND_ERROR
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @projects.get("/<name>/styles/default")
@@ -280,46 +371,37 @@ def project_default_styles(name: str) -> dict:
     log_request()
     try:
         psql_schema = request.args.get("schema", default="public")
-        project = QSAProject(name, psql_schema)
-        if project.exists():
+        project = get_project(name, psql_schema)
+        if project:
             infos = project.default_styles()
             return jsonify(infos), 201
         else:
-            return {"error": "Project does not exist"}, 415
+            return PROJECT_NOT_FOUND_ERROR
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @projects.post("/<name>/styles/default")
 def project_update_default_style(name):
     log_request()
     try:
-        schema = {
-            "type": "object",
-            "required": ["geometry", "style"],
-            "properties": {
-                "geometry": {"type": "string"},
-                "style": {"type": "string"},
-            },
-        }
+        data = request.get_json()
+        try:
+            UPDATE_DEFAULT_STYLE_VALIDATOR(data)
+        except JsonSchemaException as e:
+            return {"error": e.message}, 415
 
         psql_schema = request.args.get("schema", default="public")
-        project = QSAProject(name, psql_schema)
-        if project.exists():
-            data = request.get_json()
-            try:
-                validate(data, schema)
-            except ValidationError as e:
-                return {"error": e.message}, 415
-
+        project = get_project(name, psql_schema)
+        if project:
             project.style_update(data["geometry"], data["style"])
-            return jsonify(True), 201
+            return true_response()
         else:
-            return {"error": "Project does not exist"}, 415
+            return PROJECT_NOT_FOUND_ERROR
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @projects.get("/<name>/layers")
@@ -327,119 +409,105 @@ def project_layers(name):
     log_request()
     try:
         psql_schema = request.args.get("schema", default="public")
-        project = QSAProject(name, psql_schema)
-        if project.exists():
+        project = get_project(name, psql_schema)
+        if project:
             return jsonify(project.layers), 201
         else:
-            return {"error": "Project does not exist"}, 415
+            return PROJECT_NOT_FOUND_ERROR
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @projects.post("/<name>/layers")
 def project_add_layer(name):
     log_request()
     try:
-        schema = {
-            "type": "object",
-            "required": ["name", "datasource", "type"],
-            "properties": {
-                "name": {"type": "string"},
-                "datasource": {"type": "string"},
-                "crs": {"type": "number"},
-                "type": {"type": "string"},
-                "overview": {"type": "boolean"},
-                "datetime": {"type": "string"},
-            },
-        }
-
+        data = request.get_json()
+        try:
+            ADD_LAYER_VALIDATOR(data)
+        except JsonSchemaException as e:
+            logger().exception(str(e.message))
+            return {"error": e.message}, 415
+
+        # project existence is checked while reading it
         psql_schema = request.args.get("schema", default="public")
         project = QSAProject(name, psql_schema)
 
-        if project.exists():
-            data = request.get_json()
-            try:
-                validate(data, schema)
-            except ValidationError as e:
-                logger().exception(str(e.message))                
-                return {"error": e.message}, 415
+        rc, err = _add_layer(project, psql_schema, data)
+        if rc:
+            return true_response()
+        else:
+            logger().exception(str(err))
+            return {"error": err}, 415
+    except Exception as e:
+        logger().exception(str(e))
+        return INTERNAL_SERVER_ERROR
 
-            crs = -1
-            if "crs" in data:
-                crs = int(data["crs"])
-
-            overview = False
-            if "overview" in data:
-                overview = data["overview"]
-
-            datetime = None
-            if "datetime" in data:
-                # check format "yyyy-MM-dd HH:mm:ss"
-                datetime = QDateTime.fromString(
-                    data["datetime"], "yyyy-MM-dd HH:mm:ss"
-                )
-                if not datetime.isValid():
-                    logger().exception("Invalid datetime")          
-                    return {"error": "Invalid datetime"}, 415
-
-            rc, err = project.add_layer(
-                data["datasource"],
-                data["type"],
-                data["name"],
-                crs,
-                overview,
-                datetime,
-            )
-            if rc:
-                return jsonify(rc), 201
-            else:
-                logger().exception(str(err))  
+
+@projects.post("/<name>/layers:batch")
+def project_add_layers(name):
+    log_request()
+    try:
+        data = request.get_json()
+        try:
+            BATCH_VALIDATOR(data)
+            for item in data["items"]:
+                ADD_LAYER_VALIDATOR(item)
+        except JsonSchemaException as e:
+            logger().exception(str(e.message))
+            return {"error": e.message}, 415
+
+        # project existence is checked while reading it, the same instance
+        # is used for all layers
+        psql_schema = request.args.get("schema", default="public")
+        project = QSAProject(name, psql_schema)
+
+        # stop at the first failure, previous layers are kept
+        for item in data["items"]:
+            rc, err = _add_layer(project, psql_schema, item)
+            if not rc:
+                logger().exception(str(err))
                 return {"error": err}, 415
-        else:
-            logger().exception("Project does not exist")
-            return {"error": "Project does not exist"}, 415
+        return true_response()
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @projects.get("/<name>/layers/<layer_name>")
 def project_info_layer(name, layer_name):
     log_request()
     try:
+        # project and layer existence are checked while reading them
         psql_schema = request.args.get("schema", default="public")
         project = QSAProject(name, psql_schema)
-        if project.exists():
-            layer_infos = project.layer(layer_name)
-            if layer_infos:
-                return jsonify(layer_infos), 201
-            else:
-                return {"error": "Layer does not exist"}, 415
-        else:
-            return {"error": "Project does not exist"}, 415
+
+        layer_infos, err = project.layer(layer_name)
+        if err:
+            return {"error": err}, 415
+        return jsonify(layer_infos), 201
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @projects.delete("/<name>/layers/<layer_name>")
 def project_del_layer(name, layer_name):
     log_request()
     try:
+        # project and layer existence are checked while reading them
         psql_schema = request.args.get("schema", default="public")
         project = QSAProject(name, psql_schema)
-        if project.exists():
-            if project.layer_exists(layer_name):
-                rc = project.remove_layer(layer_name)
-                return jsonify(rc), 201
-            else:
-                return {"error": "Layer does not exist"}, 415
-        else:
-            return {"error": "Project does not exist"}, 415
+
+        rc, err = project.remove_layer(layer_name)
+        WMS.clear_cache(name, psql_schema, layer_name)
+        if not rc:
+            return {"error": err}, 415
+        return true_response()
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @projects.get("/<name>/cache")
@@ -447,17 +515,17 @@ def project_cache(name):
     log_request()
     try:
         psql_schema = request.args.get("schema", default="public")
-        project = QSAProject(name, psql_schema)
-        if project.exists():
+        project = get_project(name, psql_schema)
+        if project:
             cache_infos, err = project.cache_metadata()
             if err:
                 return {"error": err}, 415
             return jsonify(cache_infos), 201
         else:
-            return {"error": "Project does not exist"}, 415
+            return PROJECT_NOT_FOUND_ERROR
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @projects.post("/<name>/cache/reset")
@@ -465,14 +533,57 @@ def project_cache_reset(name):
     log_request()
     try:
         psql_schema = request.args.get("schema", default="public")
-        project = QSAProject(name, psql_schema)
-        if project.exists():
+        project = get_project(name, psql_schema)
+        if project:
             rc, err = project.cache_reset()
             if err:
                 return {"error": err}, 415
-            return jsonify(rc), 201
+            return true_response()
         else:
-            return {"error": "Project does not exist"}, 415
+            return PROJECT_NOT_FOUND_ERROR
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
+
+
+def _add_style(project: QSAProject, data: dict) -> (bool, str):
+    return project.add_style(
+        data["name"],
+        data["type"],
+        data["symbology"],
+        data["rendering"],
+    )
+
+
+def _add_layer(
+    project: QSAProject, psql_schema: str, data: dict
+) -> (bool, str):
+    crs = int(data.get("crs", -1))
+    overview = data.get("overview", False)
+
+    datetime = None
+    dt_str = data.get("datetime")
+    if dt_str is not None:
+        # check format "yyyy-MM-dd HH:mm:ss"
+        dt = None
+        if DATETIME_RE.match(dt_str):
+            try:
+                dt = pydatetime.strptime(dt_str, DATETIME_FORMAT)
+            except ValueError:
+                pass
+
+        if dt is None:
+            return False, "Invalid datetime"
+
+        datetime = QDateTime(dt)
+
+    rc, err = project.add_layer(
+        data["datasource"],
+        data["type"],
+        data["name"],
+        crs,
+        overview,
+        datetime,
+    )
+    WMS.clear_cache(project.name, psql_schema, data["name"])
+    return rc, err
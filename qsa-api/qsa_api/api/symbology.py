@@ -13,7 +13,7 @@ from qgis.core import (
 )
 
 from ..utils import logger
-from .utils import log_request
+from .utils import log_request, INTERNAL_SERVER_ERROR
 
 
 symbology = Blueprint("symbology", __name__)
@@ -27,7 +27,7 @@ def symbology_symbols_line():
         return jsonify(props)
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @symbology.get("/vector/polygon/single_symbol/fill/properties")
@@ -41,7 +41,7 @@ def symbology_symbols_fill():
         return jsonify(props)
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @symbology.get("/vector/point/single_symbol/marker/properties")
@@ -55,7 +55,7 @@ def symbology_symbols_marker():
         return jsonify(props)
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @symbology.get("/vector/rendering/properties")
@@ -67,7 +67,7 @@ def symbology_vector_rendering():
         return jsonify(props)
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @symbology.get(
@@ -86,7 +86,7 @@ def symbology_raster_singlebandgray():
         return jsonify(props)
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @symbology.get(
@@ -106,7 +106,7 @@ def symbology_raster_multibandcolor():
         return jsonify(props)
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @symbology.get(
@@ -132,7 +132,7 @@ def symbology_raster_singlebandpseudocolor():
         return jsonify(props)
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @symbology.get(
@@ -155,7 +155,7 @@ def symbology_raster_singlebandpseudocolor_ramp_props(name):
         return jsonify(props)
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
 
 
 @symbology.get("/raster/rendering/properties")
@@ -170,4 +170,4 @@ def symbology_raster_rendering():
         return jsonify(props)
     except Exception as e:
         logger().exception(str(e))
-        return {"error": "internal server error"}, 415
+        return INTERNAL_SERVER_ERROR
@@ -1,12 +1,56 @@
 # coding: utf8
 
 import sys
+import logging
 import inspect
-from flask import request  # Importer request pour récupérer le payload
+from flask import g, request, Response  # Importer request pour récupérer le payload
+
 from ..utils import logger
+from ..project import QSAProject, PROJECT_NOT_FOUND, LAYER_NOT_FOUND
+
+
+# shared error responses, never mutated
+INTERNAL_SERVER_ERROR = ({"error": "internal server error"}, 415)
+PROJECT_NOT_FOUND_ERROR = ({"error": PROJECT_NOT_FOUND}, 415)
+LAYER_NOT_FOUND_ERROR = ({"error": LAYER_NOT_FOUND}, 415)
+STYLE_NOT_FOUND_ERROR = ({"error": "Style does not exist"}, 415)
+MONITORING_DISABLED_ERROR = (
+    {"error": "QGIS Server monitoring is not activated"},
+    415,
+)
+INSTANCE_NOT_FOUND_ERROR = (
+    {"error": "QGIS Server instance is not available"},
+    415,
+)
+
+
+TRUE_BODY = b"true\n"  # jsonify(True) payload
+
+
+def true_response(status: int = 201) -> Response:
+    # a fresh response is built every time because Flask may alter it
+    # afterwards (headers, cookies, ...), but JSON encoding is skipped
+    return Response(TRUE_BODY, status=status, mimetype="application/json")
+
+
+def get_project(name: str, schema: str) -> QSAProject | None:
+    # resolve the project and its existence only once per request
+    if "projects" not in g:
+        g.projects = {}
+
+    key = (name, schema)
+    if key not in g.projects:
+        project = QSAProject(name, schema)
+        g.projects[key] = project if project.exists() else None
+    return g.projects[key]
 
 
 def log_request():
+    # early break: inspecting the caller and its payload is only useful when
+    # the message is actually emitted
+    if not logger().isEnabledFor(logging.DEBUG):
+        return
+
     caller_stack = inspect.stack()[1]
     caller_fct = caller_stack.function
 
@@ -29,7 +73,13 @@ def log_request():
         elif request.data:
             payload = request.data.decode("utf-8")  # Raw data
     except Exception as e:
-        logger().error(f"Failed to extract payload: {e}")
+        logger().error("Failed to extract payload: %s", e)
         payload = "Unable to parse payload"
 
-    logger().debug(f"[{req_type}] {caller_mod.__name__}.{caller_fct} - Payload: {payload}")
+    logger().debug(
+        "[%s] %s.%s - Payload: %s",
+        req_type,
+        caller_mod.__name__,
+        caller_fct,
+        payload,
+    )
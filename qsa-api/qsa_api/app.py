@@ -4,6 +4,7 @@ import click
 from flask import Flask
 
 from qsa_api.config import QSAConfig
+from qsa_api.utils import QSAJSONProvider
 from qsa_api.monitor import QSAMonitor
 from qsa_api.api.projects import projects
 from qsa_api.api.symbology import symbology
@@ -11,6 +12,7 @@ from qsa_api.api.instances import instances
 from qsa_api.api.processing import processing
 
 app = Flask(__name__)
+app.json = QSAJSONProvider(app)
 
 
 class QSA:
@@ -57,6 +57,15 @@ class QSAConfig:
     @property
     def qgisserver_projects_psql_port(self) -> str:
         return os.environ.get("QSA_QGISSERVER_PROJECTS_PSQL_PORT", "")
+
+    @property
+    def qgisserver_projects_psql_cache_ttl(self) -> float:
+        # the cache is per process: other workers or QSA instances may see a
+        # created/removed project only after this delay. 0 disables it.
+        return float(
+            os.environ.get("QSA_QGISSERVER_PROJECTS_PSQL_CACHE_TTL", "2")
+        )
+
     @property
     def mapproxy_projects_dir(self) -> str:
         return os.environ.get("QSA_MAPPROXY_PROJECTS_DIR", "").replace('"', "")
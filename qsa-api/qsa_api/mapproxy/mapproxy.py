@@ -1,6 +1,7 @@
 # coding: utf8
 
 import sys
+import logging
 import os
 import yaml
 import boto3
@@ -181,6 +182,11 @@ class QSAMapProxy:
             self.cfg["sources"].pop(source_name)
 
     def debug(self, msg: str) -> None:
+        # early break: the caller lookup is only useful when the message
+        # is actually emitted
+        if not logger().isEnabledFor(logging.DEBUG):
+            return
+
         caller = f"{self.__class__.__name__}.{sys._getframe().f_back.f_code.co_name}"
         msg = f"[{caller}][{self.name}] {msg}"
         logger().debug(msg)
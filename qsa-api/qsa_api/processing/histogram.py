@@ -4,6 +4,8 @@ from multiprocessing import Process, Manager
 
 from qgis.core import QgsProject, QgsRectangle
 
+from ..project import READ_ONLY_FLAGS
+
 
 class Histogram:
     def __init__(self, project_uri: str, layer: str) -> None:
@@ -35,7 +37,7 @@ class Histogram:
     ) -> None:
 
         project = QgsProject.instance()
-        project.read(project_uri)
+        project.read(project_uri, READ_ONLY_FLAGS)
         lyr = project.mapLayersByName(layer)[0]
 
         histo = {}
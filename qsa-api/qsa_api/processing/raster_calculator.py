@@ -21,6 +21,7 @@ from qgis.core import (
     QgsCoordinateReferenceSystem,
 )
 
+from ..project import READ_ONLY_FLAGS
 from ..utils import s3_bucket_upload, s3_parse_uri, logger
 
 
@@ -143,7 +144,7 @@ class RasterCalculator:
         params.crs = QgsCoordinateReferenceSystem("EPSG:3857")
 
         project = QgsProject.instance()
-        project.read(project_uri)
+        project.read(project_uri, READ_ONLY_FLAGS)
 
         lyr_names = []
         extent = None
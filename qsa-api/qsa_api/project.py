@@ -1,9 +1,16 @@
 # coding: utf8
 
+import os
+import re
 import sys
+import logging
+import time
 import shutil
 import sqlite3
+import xml.etree.ElementTree as ET
 from pathlib import Path
+from typing import Iterator
+from functools import lru_cache, cached_property
 
 from qgis.PyQt.QtGui import QColor
 from qgis.PyQt.QtCore import Qt, QDateTime
@@ -12,6 +19,7 @@ from qgis.core import (
     QgsProject,
     QgsWkbTypes,
     QgsMapLayer,
+    QgsMapLayerStyle,
     QgsUnitTypes,
     QgsDataSourceUri,
     QgsFillSymbol,
@@ -23,6 +31,7 @@ from qgis.core import (
     QgsDateTimeRange,
     QgsRendererRange,
     QgsRendererCategory,
+    QgsSymbolLayerUtils,
     QgsRasterMinMaxOrigin,
     QgsContrastEnhancement,
     QgsSvgMarkerSymbolLayer,
@@ -36,10 +45,97 @@ from .mapproxy import QSAMapProxy
 from .vector import VectorSymbologyRenderer
 from .utils import StorageBackend, config, logger
 from .raster import RasterSymbologyRenderer, RasterOverview
+from .raster.renderer import EMPTY_TIF
 
 
 RENDERER_TAG_NAME = "renderer-v2"  # constant from core/symbology/renderer.h
 
+# flags to read a project which is never written back: layers are resolved
+# but layouts and original layer styles are skipped
+READ_ONLY_FLAGS = (
+    Qgis.ProjectReadFlag.ForceReadOnlyLayers
+    | Qgis.ProjectReadFlag.DontLoadLayouts
+    | Qgis.ProjectReadFlag.DontStoreOriginalStyles
+)
+
+PROJECT_NOT_FOUND = "Project does not exist"
+LAYER_NOT_FOUND = "Layer does not exist"
+
+# projects stored in PostgreSQL, indexed by URI: (timestamp, {name: None})
+PSQL_PROJECTS_CACHE: dict = {}
+
+# layer names of filesystem projects, indexed by path: ((mtime, size), names)
+LAYERS_CACHE: dict = {}
+
+# table name in a datasource like `"schema"."table" (wkb_geometry)`
+WKB_TABLE_RE = re.compile(r'\.\s*"?([^".(\s]+)"?\s*\(wkb_geometry\)')
+
+
+@lru_cache(maxsize=1)
+def psql_storage():
+    return (
+        QgsApplication.instance()
+        .projectStorageRegistry()
+        .projectStorageFromType("postgresql")
+    )
+
+
+@lru_cache(maxsize=8)
+def psql_uri(dbname: str, user: str, password: str, host: str, port: str) -> str:
+    # keyed on the settings so that a configuration change builds a new URI
+    return f"postgresql://{user}:{password}@{host}:{port}/{dbname}?sslmode=disable&schema=public"
+
+
+def _fill_symbol(props: dict) -> QgsFillSymbol:
+    return QgsFillSymbol.createSimple(
+        {
+            "outline_width": props["outline_width"],
+            "outline_style": props["outline_style"],
+            "outline_color": props["outline_color"],
+            "outline_width_unit": "MM",
+            "color": props["color"],
+        }
+    )
+
+
+def _line_symbol(props: dict, **extra) -> QgsLineSymbol:
+    line = {
+        "line_width": props["outline_width"],
+        "line_style": props["outline_style"],
+        "color": props["outline_color"],
+        "line_width_unit": "MM",
+    }
+    line.update(extra)
+    return QgsLineSymbol.createSimple(line)
+
+
+def _round_line_symbol(props: dict) -> QgsLineSymbol:
+    return _line_symbol(props, capstyle="round", joinstyle="round")
+
+
+def _marker_symbol(props: dict) -> QgsMarkerSymbol:
+    # "r,g,b,a" string parsed by QGIS itself
+    color = QgsSymbolLayerUtils.decodeColor(str(props["color"]))
+
+    svg_layer = QgsSvgMarkerSymbolLayer(props["symbol_path"])
+    svg_layer.setColor(color)
+    svg_layer.setStrokeColor(QColor(0, 0, 0, color.alpha()))
+    svg_layer.setSize(props["size"])
+
+    symbol = QgsMarkerSymbol.createSimple({})
+    symbol.changeSymbolLayer(0, svg_layer)
+    symbol.setSizeUnit(QgsUnitTypes.RenderMillimeters)
+    return symbol
+
+
+# symbol builders indexed by symbol type, taking a row of style properties
+SYMBOL_BUILDERS = {
+    "fill": _fill_symbol,
+    "line": _line_symbol,
+    "marker": _marker_symbol,
+}
+SINGLE_SYMBOL_BUILDERS = {**SYMBOL_BUILDERS, "line": _round_line_symbol}
+
 
 class QSAProject:
     def __init__(self, name: str, schema: str = "public") -> None:
@@ -48,7 +144,14 @@ class QSAProject:
         if schema:
             self.schema = schema
 
-    @property
+        # QgsProject read from storage, indexed by read flags
+        self._projects: dict = {}
+        # layers of a cached QgsProject indexed by name, keyed by project id
+        self._layer_indexes: dict = {}
+
+        self._sqlite_con: sqlite3.Connection | None = None
+
+    @cached_property
     def sqlite_db(self) -> Path:
         p = self._qgis_project_dir / "qsa.db"
         if not p.exists():
@@ -72,73 +175,73 @@ class QSAProject:
         p = []
 
         if StorageBackend.type() == StorageBackend.FILESYSTEM:
-            for i in QSAProject._qgis_projects_dir().glob("**/*.qgs"):
-                name = i.parent.name.replace(
-                    QSAProject._qgis_project_dir_prefix(), ""
-                )
-                p.append(QSAProject(name))
+            projects_dir = QSAProject._qgis_projects_dir()
+            prefix = QSAProject._qgis_project_dir_prefix()
+            for entry in QSAProject._scandir(projects_dir, ".qgs"):
+                parent = os.path.basename(os.path.dirname(entry.path))
+                p.append(QSAProject(parent.removeprefix(prefix)))
             return p
         else:
-            dbname = config().qgisserver_projects_psql_dbname
-            user = config().qgisserver_projects_psql_user
-            password = config().qgisserver_projects_psql_password
-            host = config().qgisserver_projects_psql_host
-            port = config().qgisserver_projects_psql_port
-            uri = f"postgresql://{user}:{password}@{host}:{port}/{dbname}?sslmode=disable&schema=public"
+            uri = QSAProject._psql_uri()
             # service = config().qgisserver_projects_psql_service
             # uri = f"postgresql:?service={service}&schema={schema}"
 
-            storage = (
-                QgsApplication.instance()
-                .projectStorageRegistry()
-                .projectStorageFromType("postgresql")
-            )
-            for pname in storage.listProjects(uri): 
+            for pname in QSAProject._psql_projects(uri):
                 p.append(QSAProject(pname, schema))
 
         return p
 
     @property
-    def styles(self) -> list[str]:
-        s = []
-        for qml in self._qgis_project_dir.glob("**/*.qml"):
-            s.append(qml.stem)
-        self.debug(f"{len(s)} styles found")
-        return s
+    def styles(self) -> Iterator[str]:
+        # lazily yielded, use style_exists() for membership tests
+        for entry in QSAProject._scandir(self._qgis_project_dir, ".qml"):
+            yield entry.name[:-4]
 
     @property
-    def project(self) -> QgsProject:
-        project = QgsProject()
-        project.read(self._qgis_project_uri, Qgis.ProjectReadFlag.DontResolveLayers)
-        return project
+    def project(self) -> QgsProject | None:
+        return self._load_project()
 
-    @property
+    @cached_property
     def layers(self) -> list:
         layers = []
 
-        p = QgsProject()
-        p.read(self._qgis_project_uri, Qgis.ProjectReadFlag.DontResolveLayers)
+        # a filesystem project is read again only once modified
+        key = None
+        if self._storage == StorageBackend.FILESYSTEM:
+            try:
+                st = os.stat(self._qgis_project_uri)
+            except FileNotFoundError:
+                return layers
+
+            key = (st.st_mtime_ns, st.st_size)
+            cached = LAYERS_CACHE.get(self._qgis_project_uri)
+            if cached and cached[0] == key:
+                return list(cached[1])
+
+        p = self._load_project()
+        if p is None:
+            return layers
 
         for layer in p.mapLayers().values():
             layers.append(layer.name())
         self.debug(f"{len(layers)} layers found")
+
+        if key is not None:
+            LAYERS_CACHE[self._qgis_project_uri] = (key, tuple(layers))
         return layers
 
     @property
     def metadata(self) -> dict:
         m = {}
 
-        p = QgsProject()
-        p.read(self._qgis_project_uri, Qgis.ProjectReadFlag.DontResolveLayers)
+        header = self._project_header()
+        if header is None:
+            return m
 
-        m["author"] = p.metadata().author()
-        m["creation_datetime"] = (
-            p.metadata().creationDateTime().toString(Qt.ISODate)
-        )
-        m["crs"] = p.crs().authid()
-        m["storage"] = StorageBackend.type().name.lower()
+        m.update(header)
+        m["storage"] = self._storage.name.lower()
 
-        if StorageBackend.type() == StorageBackend.POSTGRESQL:
+        if self._storage == StorageBackend.POSTGRESQL:
             m["schema"] = self.schema
 
         m["cache"] = "disabled"
@@ -159,8 +262,9 @@ class QSAProject:
             if not rc:
                 return False, err
 
-            p = QgsProject()
-            p.read(self._qgis_project_uri)
+            p = self._load_project(Qgis.ProjectReadFlags())
+            if p is None:
+                return False, PROJECT_NOT_FOUND
 
             for layer in p.mapLayers().values():
                 t = layer.type()
@@ -172,23 +276,20 @@ class QSAProject:
                     layer.name(), bbox, epsg_code, t == Qgis.LayerType.Raster, None
                 )
 
-                mp.write()
+            # configuration is dumped once, not after every layer
+            mp.write()
 
             return True, ""
 
         return False, "Cache is disabled"
 
     def style_default(self, geometry: str) -> bool:
-        con = sqlite3.connect(self.sqlite_db.as_posix())
-        cur = con.cursor()
-        sql = f"SELECT style FROM styles_default WHERE geometry = '{geometry}'"
-        res = cur.execute(sql)
-        default_style = res.fetchone()[0]
-        con.close()
-        return default_style
+        sql = "SELECT style FROM styles_default WHERE geometry = ?"
+        res = self._sqlite.execute(sql, (geometry,))
+        return res.fetchone()[0]
 
     def style(self, name: str) -> (dict, str):
-        if name not in self.styles:
+        if not self.style_exists(name):
             return {}, "Invalid style"
 
         path = self._qgis_project_dir / f"{name}.qml"
@@ -198,33 +299,25 @@ class QSAProject:
         else:
             return RasterSymbologyRenderer.style_to_json(path)
 
-    def style_update(self, geometry: str, style: str) -> None:
-        con = sqlite3.connect(self.sqlite_db.as_posix())
-        cur = con.cursor()
-        sql = f"UPDATE styles_default SET style = '{style}' WHERE geometry = '{geometry}'"
-        cur.execute(sql)
-        con.commit()
-        con.close()
-
-    def default_styles(self) -> list:
-        s = {}
+    def style_exists(self, name: str) -> bool:
+        return (self._qgis_project_dir / f"{name}.qml").exists()
 
-        s["polygon"] = self.style_default("polygon")
-        s["line"] = self.style_default("line")
-        s["point"] = self.style_default("point")
+    def style_update(self, geometry: str, style: str) -> None:
+        sql = "UPDATE styles_default SET style = ? WHERE geometry = ?"
+        self._sqlite.execute(sql, (style, geometry))
 
-        return s
+    def default_styles(self) -> dict:
+        sql = "SELECT geometry, style FROM styles_default WHERE geometry IN (?, ?, ?)"
+        res = self._sqlite.execute(sql, ("polygon", "line", "point"))
+        return dict(res.fetchall())
 
-    def layer(self, name: str) -> dict:
-        flags = Qgis.ProjectReadFlags()
-        flags |= Qgis.ProjectReadFlag.ForceReadOnlyLayers
-        project = QgsProject()
-        project.read(self._qgis_project_uri,flags)
-
-        layers = project.mapLayersByName(name)
-        if layers:
-            layer = layers[0]
+    def layer(self, name: str) -> (dict, str):
+        project = self._load_project(READ_ONLY_FLAGS)
+        if project is None:
+            return {}, PROJECT_NOT_FOUND
 
+        layer = self._layer_index(project).get(name)
+        if layer is not None:
             infos = {}
             infos["name"] = layer.name()
             infos["type"] = layer.type().name.lower()
@@ -242,8 +335,8 @@ class QSAProject:
             infos["valid"] = layer.isValid()
             infos["bbox"] = layer.extent().asWktCoordinates()
 
-            return infos
-        return {}
+            return infos, ""
+        return {}, LAYER_NOT_FOUND
 
     def layer_update_style(
         self, layer_name: str, style_name: str, current: bool
@@ -254,14 +347,15 @@ class QSAProject:
         # if style_name != "default" and style_name not in self.styles:
         #     return False, f"Style '{style_name}' does not exist"
                 
+        project = self._load_project(Qgis.ProjectReadFlags())
+        if project is None:
+            return False, PROJECT_NOT_FOUND
+
         self.debug("Start for clearing MapProxy cache")
         mp = QSAMapProxy(self.name)
         mp.clear_cache(layer_name)
-        
+
         self.debug("clear_cache is finish")
-     
-        project = QgsProject()
-        project.read(self._qgis_project_uri)
 
         self.debug(f"project.read : {len(project.mapLayers(False))}")
         
@@ -269,17 +363,32 @@ class QSAProject:
             self.debug(f"layer_name : {a}")
         
         self.debug(f"Layer name use : {layer_name.strip()}")
-        style_path = self._qgis_project_dir / f"{style_name}.qml"
-        layer = project.mapLayersByName(layer_name.strip())[0]
+        layer = self._layer_index(project).get(layer_name.strip())
+        if layer is None:
+            return False, LAYER_NOT_FOUND
+
+        if not self._apply_style(layer, style_name, current):
+            return False, "Style does not exist"
+
+        self.debug("Write project")
+        project.write()
+        self._clear_cache()
+
+        return True, ""
 
-        self.debug("project.mapLayersByName")
+    def _apply_style(
+        self, layer: QgsMapLayer, style_name: str, current: bool
+    ) -> bool:
         if style_name not in layer.styleManager().styles():
-            self.debug(f"Add new style {style_name} in style manager")
-            l = layer.clone()
-            l.loadNamedStyle(style_path.as_posix())  # set "default" style
+            style_path = self._qgis_project_dir / f"{style_name}.qml"
+            if not style_path.exists():
+                return False
 
+            self.debug(f"Add new style {style_name} in style manager")
+            # the QML document is applied by the style manager itself, no
+            # need to load it into a clone of the layer first
             layer.styleManager().addStyle(
-                style_name, l.styleManager().style("default")
+                style_name, QgsMapLayerStyle(style_path.read_text())
             )
 
         if current:
@@ -293,66 +402,73 @@ class QSAProject:
                 renderer = RasterSymbologyRenderer(layer.renderer().type())
                 renderer.refresh_min_max(layer)
 
-        self.debug("Write project")
-        project.write()
-
-        return True, ""
+        return True
 
     def layer_exists(self, name: str) -> bool:
-        return bool(self.layer(name))
+        project = self._load_project()
+        if project is None:
+            return False
+        return name in self._layer_index(project)
 
-    def remove_layer(self, name: str) -> bool:
-        # remove layer in qgis project
-        project = QgsProject()
-        project.read(self._qgis_project_uri, Qgis.ProjectReadFlag.DontResolveLayers)
+    def remove_layer(self, name: str) -> (bool, str):
+        return self._remove_layers([name])
+
+    def _remove_layers(self, names: list[str]) -> (bool, str):
+        # remove layers in qgis project with a single read/write
+        project = self._load_project()
+        if project is None:
+            return False, PROJECT_NOT_FOUND
 
+        names_set = set(names)
         ids = []
-        for layer in project.mapLayersByName(name):
-            ids.append(layer.id())
+        for layer in project.mapLayers().values():
+            if layer.name() in names_set:
+                ids.append(layer.id())
+
+        if not ids:
+            return False, LAYER_NOT_FOUND
+
         project.removeMapLayers(ids)
 
         rc = project.write()
+        self._clear_cache()
+        if not rc:
+            return False, project.error()
 
-        # remove layer in mapproxy config
+        # remove layers in mapproxy config
         if self._mapproxy_enabled:
             mp = QSAMapProxy(self.name)
             rc, err = mp.read()
             if not rc:
                 self.debug(err)
-                return False
+                return False, err
 
-            mp.remove_layer(name)
+            for name in names:
+                mp.remove_layer(name)
             mp.write()
 
-        return rc
+        return True, ""
 
     def exists(self) -> bool:
-        if StorageBackend.type() == StorageBackend.FILESYSTEM:
+        if self._storage == StorageBackend.FILESYSTEM:
             return self._qgis_project_dir.exists()
         else:
-            dbname = config().qgisserver_projects_psql_dbname
-            user = config().qgisserver_projects_psql_user
-            password = config().qgisserver_projects_psql_password
-            host = config().qgisserver_projects_psql_host
-            port = config().qgisserver_projects_psql_port
-            uri = f"postgresql://{user}:{password}@{host}:{port}/{dbname}?sslmode=disable&schema=public"
+            uri = QSAProject._psql_uri()
             # service = config().qgisserver_projects_psql_service
             # uri = f"postgresql:?service={service}&schema={self.schema}"
             self.debug(uri)
-            storage = (
-                QgsApplication.instance()
-                .projectStorageRegistry()
-                .projectStorageFromType("postgresql")
-            )
-            projects = storage.listProjects(uri)
-            self.debug(f"test {len(projects)}")
-            # necessary step if the project has been created without QSA
-            if self.name in projects:
-                self._qgis_projects_dir().mkdir(parents=True, exist_ok=True)
+            if self.name not in QSAProject._psql_projects(uri):
+                return False
 
-            return self.name in projects and self._qgis_projects_dir().exists()
+            # necessary step if the project has been created without QSA
+            self._qgis_projects_dir().mkdir(parents=True, exist_ok=True)
+            return True
 
     def create(self, author: str) -> (bool, str):
+        # never trust the cached listing before writing a project
+        if self._storage == StorageBackend.POSTGRESQL:
+            PSQL_PROJECTS_CACHE.pop(QSAProject._psql_uri(), None)
+
         if self.exists():
             return False
 
@@ -373,6 +489,8 @@ class QSAProject:
         self.debug("Write QGIS project")
       
         rc = project.write(self._qgis_project_uri)
+        self._clear_cache()
+        PSQL_PROJECTS_CACHE.clear()
         self.debug(f"Create Project ok : {rc}")
         # create mapproxy config file
         if self._mapproxy_enabled:
@@ -387,8 +505,9 @@ class QSAProject:
 
     def remove(self) -> None:
         # clear cache and stuff
-        for layer in self.layers:
-            self.remove_layer(layer)
+        layers = self.layers
+        if layers:
+            self._remove_layers(layers)
 
         # remove mapproxy config file
         if self._mapproxy_enabled:
@@ -396,16 +515,18 @@ class QSAProject:
             mp.remove()
 
         # remove qsa projects dir
+        if self._sqlite_con is not None:
+            self._sqlite_con.close()
+            self._sqlite_con = None
+        self.__dict__.pop("sqlite_db", None)
         shutil.rmtree(self._qgis_project_dir, ignore_errors=True)
+        RasterSymbologyRenderer.invalidate_style(self._qgis_project_dir)
+        self._clear_cache()
 
         # remove remove qgis prohect in db if necessary
-        if StorageBackend.type() == StorageBackend.POSTGRESQL:
-            storage = (
-                QgsApplication.instance()
-                .projectStorageRegistry()
-                .projectStorageFromType("postgresql")
-            )
-            storage.removeProject(self._qgis_project_uri)
+        if self._storage == StorageBackend.POSTGRESQL:
+            psql_storage().removeProject(self._qgis_project_uri)
+            PSQL_PROJECTS_CACHE.clear()
 
     def add_layer(
         self,
@@ -420,7 +541,11 @@ class QSAProject:
         if t is None:
             return False, "Invalid layer type"
 
-        if name in self.layers:
+        project = self._load_project()
+        if project is None:
+            return False, PROJECT_NOT_FOUND
+
+        if name in self._layer_index(project):
             return False, f"A layer {name} already exists"
 
         provider = QSAProject._layer_provider(t, datasource)
@@ -428,18 +553,19 @@ class QSAProject:
         lyr = None
         if t == Qgis.LayerType.Vector:
             self.debug("Init vector layer")
-            dbname = config().qgisserver_projects_psql_dbname
-            user = config().qgisserver_projects_psql_user
-            password = config().qgisserver_projects_psql_password
-            host = config().qgisserver_projects_psql_host
-            port = config().qgisserver_projects_psql_port
             tableName = datasource
-            if("wkb_geometry" in datasource):
-                tableName = datasource.split(".")[1].replace('"',"").replace("(wkb_geometry)","").strip()
-                
-                uri = QgsDataSourceUri()    
-                uri.setConnection(host, port, dbname, user, password)
-                uri.setDataSource("public",tableName, "wkb_geometry")
+            m = WKB_TABLE_RE.search(datasource)
+            if m:
+                cfg = config()
+                uri = QgsDataSourceUri()
+                uri.setConnection(
+                    cfg.qgisserver_projects_psql_host,
+                    cfg.qgisserver_projects_psql_port,
+                    cfg.qgisserver_projects_psql_dbname,
+                    cfg.qgisserver_projects_psql_user,
+                    cfg.qgisserver_projects_psql_password,
+                )
+                uri.setDataSource("public", m.group(1), "wkb_geometry")
 
                 tableName = uri.uri(False)
             self.debug(f"Test tbe : {tableName}")
@@ -485,21 +611,23 @@ class QSAProject:
         if not lyr.isValid():
             return False, f"Invalid layer ({lyr.error()})"
 
-        # create project
-        project = QgsProject()
-        project.read(self._qgis_project_uri, Qgis.ProjectReadFlag.DontResolveLayers)
-        project.addMapLayer(lyr)
-
-        self.debug("Write QGIS project")
-        project.write()
-
-        # set default style
+        # set default style before the project is written, so that it is
+        # written only once
         if t == Qgis.LayerType.Vector:
             self.debug("Set default style")
             geometry = lyr.geometryType().name.lower()
             default_style = self.style_default(geometry)
 
-            self.layer_update_style(name, default_style, True)
+            if not self._apply_style(lyr, default_style, True):
+                # the layer keeps its own default style
+                self.debug(f"Default style {default_style} does not exist")
+
+        # add layer in project
+        project.addMapLayer(lyr)
+
+        self.debug("Write QGIS project")
+        project.write()
+        self._clear_cache()
 
         # add layer in mapproxy config file
         if self._mapproxy_enabled:
@@ -553,13 +681,14 @@ class QSAProject:
         if "properties" not in symbology:
             return False, "`properties` is missing in `symbology`"
 
-        # init renderer
-        tif = Path(__file__).resolve().parent / "raster" / "empty.tif"
-        rl = QgsRasterLayer(tif.as_posix(), "", "gdal")
-
-        # symbology
+        # symbology, checked before opening the template raster
         renderer = RasterSymbologyRenderer(symbology["type"])
         renderer.load(symbology["properties"])
+        if not renderer.renderer:
+            return False, "Error"
+
+        # init renderer
+        rl = QgsRasterLayer(EMPTY_TIF, "", "gdal")
 
         # config rendering
         if "gamma" in rendering:
@@ -577,75 +706,74 @@ class QSAProject:
             )
 
         # save style
-        if renderer.renderer:
-            rl.setRenderer(renderer.renderer)
+        rl.setRenderer(renderer.renderer)
 
-            # contrast enhancement needs to be managed after setting renderer
-            if renderer.contrast_algorithm:
-                rl.setContrastEnhancement(
-                    renderer.contrast_algorithm, renderer.contrast_limits
-                )
+        # contrast enhancement needs to be managed after setting renderer
+        if renderer.contrast_algorithm:
+            rl.setContrastEnhancement(
+                renderer.contrast_algorithm, renderer.contrast_limits
+            )
 
-                # user defined min/max
+            # user defined min/max
+            if (
+                renderer.contrast_limits
+                == QgsRasterMinMaxOrigin.Limits.None_
+            ):
                 if (
-                    renderer.contrast_limits
-                    == QgsRasterMinMaxOrigin.Limits.None_
+                    renderer.type
+                    == RasterSymbologyRenderer.Type.SINGLE_BAND_GRAY
                 ):
-                    if (
-                        renderer.type
-                        == RasterSymbologyRenderer.Type.SINGLE_BAND_GRAY
-                    ):
-                        ce = QgsContrastEnhancement(
-                            rl.renderer().contrastEnhancement()
-                        )
-                        if renderer.gray_min is not None:
-                            ce.setMinimumValue(renderer.gray_min)
-                        if renderer.gray_max is not None:
-                            ce.setMaximumValue(renderer.gray_max)
-                        rl.renderer().setContrastEnhancement(ce)
-                    elif (
-                        renderer.type
-                        == RasterSymbologyRenderer.Type.MULTI_BAND_COLOR
-                    ):
-                        # red
-                        red_ce = QgsContrastEnhancement(
-                            rl.renderer().redContrastEnhancement()
-                        )
-                        if renderer.red_min is not None:
-                            red_ce.setMinimumValue(renderer.red_min)
-                        if renderer.red_max is not None:
-                            red_ce.setMaximumValue(renderer.red_max)
-                        rl.renderer().setRedContrastEnhancement(red_ce)
-
-                        # green
-                        green_ce = QgsContrastEnhancement(
-                            rl.renderer().greenContrastEnhancement()
-                        )
-                        if renderer.green_min is not None:
-                            green_ce.setMinimumValue(renderer.green_min)
-                        if renderer.green_max is not None:
-                            green_ce.setMaximumValue(renderer.green_max)
-                        rl.renderer().setGreenContrastEnhancement(green_ce)
-
-                        # blue
-                        blue_ce = QgsContrastEnhancement(
-                            rl.renderer().blueContrastEnhancement()
-                        )
-                        if renderer.blue_min is not None:
-                            blue_ce.setMinimumValue(renderer.blue_min)
-                        if renderer.blue_max is not None:
-                            blue_ce.setMaximumValue(renderer.blue_max)
-                        rl.renderer().setBlueContrastEnhancement(blue_ce)
-
-            # save
-            path = self._qgis_project_dir / f"{name}.qml"
-            rl.saveNamedStyle(
-                path.as_posix(), categories=QgsMapLayer.AllStyleCategories
-            )
-            return True, ""
+                    ce = QgsContrastEnhancement(
+                        rl.renderer().contrastEnhancement()
+                    )
+                    if renderer.gray_min is not None:
+                        ce.setMinimumValue(renderer.gray_min)
+                    if renderer.gray_max is not None:
+                        ce.setMaximumValue(renderer.gray_max)
+                    rl.renderer().setContrastEnhancement(ce)
+                elif (
+                    renderer.type
+                    == RasterSymbologyRenderer.Type.MULTI_BAND_COLOR
+                ):
+                    # red
+                    red_ce = QgsContrastEnhancement(
+                        rl.renderer().redContrastEnhancement()
+                    )
+                    if renderer.red_min is not None:
+                        red_ce.setMinimumValue(renderer.red_min)
+                    if renderer.red_max is not None:
+                        red_ce.setMaximumValue(renderer.red_max)
+                    rl.renderer().setRedContrastEnhancement(red_ce)
+
+                    # green
+                    green_ce = QgsContrastEnhancement(
+                        rl.renderer().greenContrastEnhancement()
+                    )
+                    if renderer.green_min is not None:
+                        green_ce.setMinimumValue(renderer.green_min)
+                    if renderer.green_max is not None:
+                        green_ce.setMaximumValue(renderer.green_max)
+                    rl.renderer().setGreenContrastEnhancement(green_ce)
+
+                    # blue
+                    blue_ce = QgsContrastEnhancement(
+                        rl.renderer().blueContrastEnhancement()
+                    )
+                    if renderer.blue_min is not None:
+                        blue_ce.setMinimumValue(renderer.blue_min)
+                    if renderer.blue_max is not None:
+                        blue_ce.setMaximumValue(renderer.blue_max)
+                    rl.renderer().setBlueContrastEnhancement(blue_ce)
+
+        # save
+        path = self._qgis_project_dir / f"{name}.qml"
+        rl.saveNamedStyle(
+            path.as_posix(), categories=QgsMapLayer.AllStyleCategories
+        )
+        RasterSymbologyRenderer.invalidate_style(path)
+        self._clear_cache()
+        return True, ""
 
-        return False, "Error"
-  
     def _add_style_vector(
         self, name: str, symbology: dict, rendering: dict
     ) -> (bool, str):
@@ -660,8 +788,6 @@ class QSAProject:
         
 
         render = None
-        vl = QgsVectorLayer()
-        
         match symbology["type"] : 
             case "single_symbol": 
                 render = self._create_single_symbol_style(symbology)
@@ -670,207 +796,253 @@ class QSAProject:
             case "categorized": 
                 render = self._create_categorized_style(symbology)
 
-        
+        # the layer carrying the style is only built for a valid renderer
+        if not render:
+            return False, "Error"
+
+        vl = QgsVectorLayer()
         if "opacity" in rendering:
             vl.setOpacity(float(rendering["opacity"]))
 
-        if render:
-            vl.setRenderer(render)
+        vl.setRenderer(render)
 
-            path = self._qgis_project_dir / f"{name}.qml"
-            vl.saveNamedStyle(
-                path.as_posix(), categories=vl.Symbology
-            )
-            return True, ""
-
-        return False, "Error"
+        path = self._qgis_project_dir / f"{name}.qml"
+        vl.saveNamedStyle(
+            path.as_posix(), categories=vl.Symbology
+        )
+        RasterSymbologyRenderer.invalidate_style(path)
+        self._clear_cache()
+        return True, ""
     
-    def _create_categorized_style(self,symbology: dict) -> QgsCategorizedSymbolRenderer:
-        symbol = symbology["symbol"] 
+    def _create_categorized_style(
+        self, symbology: dict
+    ) -> QgsCategorizedSymbolRenderer:
         properties = symbology["properties"]
         attribut = properties["attributs"]
-        ranges = []
-        
-        match symbol:
-            case "fill":
-                for categorized_value in properties["list_categorized"]:
-                    properties = {
-                        "outline_width" : categorized_value["outline_width"],
-                        "outline_style" : categorized_value["outline_style"],
-                        "outline_color" : categorized_value["outline_color"],
-                        "color"         :categorized_value["color"]
-                    }
-                    symbol = QgsFillSymbol.createSimple(properties)
-
-                    # time = QDateTime.fromString(categorized_value["value"], "yyyy-MM-dd HH:mm:ss")
-                    range = QgsRendererCategory(categorized_value["value"], symbol, "test")                
-                    ranges.append(range)
-                
-            case "line":  
-                for categorized_value in properties["list_categorized"]:
-                    properties = {
-                        "line_width" : categorized_value["outline_width"],
-                        "line_style" : categorized_value["outline_style"],
-                        "color"         : categorized_value["outline_color"],
-                        "outline_width_unit" : "MM"
-                    }
-                    symbol = QgsLineSymbol.createSimple(properties)
-
-                    range = QgsRendererCategory(categorized_value["value"], symbol, "test")
-                    ranges.append(range)
-            case "marker":  
-                for categorized_value in properties["list_categorized"]:
-                    properties = {
-                    }
-                    symbol = QgsMarkerSymbol.createSimple(properties)
-                    svg_layer = QgsSvgMarkerSymbolLayer(categorized_value["symbol_path"])
-                    testSplit =str(categorized_value["color"]).split(",")
-                    svg_layer.setColor(QColor(int(testSplit[0]),int(testSplit[1]),int(testSplit[2]),int(testSplit[3])))
-                    svg_layer.setStrokeColor(QColor(0,0,0,int(testSplit[3])))
-                    svg_layer.setSize(categorized_value["size"])
-                    symbol.changeSymbolLayer(0, svg_layer)
-                    symbol.setSizeUnit(QgsUnitTypes.RenderMillimeters)
-                    
-                    range = QgsRendererCategory(categorized_value["value"], symbol, "test")
-                    ranges.append(range)
-            case other:  
-                    return None #Not implement
-                
-        render = QgsCategorizedSymbolRenderer(attribut, ranges)
-        return render
-    
-    def _create_graduated_style(self,symbology: dict) -> QgsGraduatedSymbolRenderer:
-        
-        symbol = symbology["symbol"] 
+
+        builder = SYMBOL_BUILDERS.get(symbology["symbol"])
+        if builder is None:
+            return None  # Not implement
+
+        categories = []
+        for categorized_value in properties["list_categorized"]:
+            category = QgsRendererCategory(
+                categorized_value["value"], builder(categorized_value), "test"
+            )
+            categories.append(category)
+
+        return QgsCategorizedSymbolRenderer(attribut, categories)
+
+    def _create_graduated_style(
+        self, symbology: dict
+    ) -> QgsGraduatedSymbolRenderer:
         properties = symbology["properties"]
         attribut = properties["attributs"]
+
+        builder = SYMBOL_BUILDERS.get(symbology["symbol"])
+        if builder is None:
+            return None  # Not implement
+
         ranges = []
-        
-        match symbol:
-            case "fill":
-                for graduated_value in properties["list_graduated"]:
-                    properties = {
-                        "outline_width" : graduated_value["outline_width"], 
-                        "outline_style" : graduated_value["outline_style"],
-                        "outline_color" : graduated_value["outline_color"],
-                        "outline_width_unit" : "MM",
-                        "color": graduated_value["color"]
-                    }
-                    symbol = QgsFillSymbol.createSimple(properties)
-
-                    range = QgsRendererRange(graduated_value["min"], graduated_value["max"], symbol, "test")
-                    ranges.append(range)
-                
-            case "line":
-                for graduated_value in properties["list_graduated"]:
-                    properties = {
-                        "line_width" : graduated_value["outline_width"],
-                        "line_style" : graduated_value["outline_style"],
-                        "color"      : graduated_value["outline_color"],
-                        "line_width_unit" : "MM"
-                    }
-                    symbol = QgsLineSymbol.createSimple(properties)
-
-                    range = QgsRendererRange(graduated_value["min"], graduated_value["max"], symbol, "test")
-                    ranges.append(range)
-            case "marker": 
-                for graduated_value in properties["list_graduated"]:
-                    properties = {
-                    }
-                    symbol = QgsMarkerSymbol.createSimple(properties)
-                    svg_layer = QgsSvgMarkerSymbolLayer(graduated_value["symbol_path"])
-                    testSplit =str(graduated_value["color"]).split(",")
-                    svg_layer.setColor(QColor(int(testSplit[0]),int(testSplit[1]),int(testSplit[2]),int(testSplit[3])))
-                    svg_layer.setStrokeColor(QColor(0,0,0,int(testSplit[3])))
-                    svg_layer.setSize(graduated_value["size"])
-                    symbol.setSizeUnit(QgsUnitTypes.RenderMillimeters)
-                    symbol.changeSymbolLayer(0, svg_layer)
-                    
-                    range = QgsRendererRange(graduated_value["min"], graduated_value["max"], symbol, "test")
-                    ranges.append(range)
-            case other:  
-                    return None #Not implement
-                
+        for graduated_value in properties["list_graduated"]:
+            range = QgsRendererRange(
+                graduated_value["min"],
+                graduated_value["max"],
+                builder(graduated_value),
+                "test",
+            )
+            ranges.append(range)
+
         render = QgsGraduatedSymbolRenderer(attribut, ranges)
-        render.setMode(QgsGraduatedSymbolRenderer.Custom) 
+        render.setMode(QgsGraduatedSymbolRenderer.Custom)
         return render
 
-    def _create_single_symbol_style(self,symbology: dict) -> QgsSingleSymbolRenderer:
-          
-        symbol = symbology["symbol"]
-        properties = symbology["properties"]
-                
-        match symbol:
-            case "fill":
-                properties_fill = {
-                    "outline_width" : properties["outline_width"], 
-                    "outline_style" : properties["outline_style"],
-                    "outline_color" : properties["outline_color"],
-                    "color" : properties["color"],
-                    "outline_width_unit" : "MM"
-                }
-                symbol = QgsFillSymbol.createSimple(properties_fill)
-            case "line":
-                properties_line = {
-                    "line_width" : properties["outline_width"],
-                    "line_style" : properties["outline_style"],
-                    "color" : properties["outline_color"],
-                    "capstyle":"round",
-                    "line_width_unit":"MM",
-                    "joinstyle":"round"
-                }
-                symbol = QgsLineSymbol.createSimple(properties_line)
-
-            case "marker": 
-                    
-                    properties_marker = {
-                    }
-                    
-                    testSplit =str(properties["color"]).split(",")
-                    symbol = QgsMarkerSymbol.createSimple(properties_marker)
-                    svg_layer = QgsSvgMarkerSymbolLayer(properties["symbol_path"])
-                    
-                    svg_layer.setColor(QColor(int(testSplit[0]),int(testSplit[1]),int(testSplit[2]),int(testSplit[3])))
-                    svg_layer.setStrokeColor(QColor(0,0,0,int(testSplit[3])))
-                    svg_layer.setSize(properties["size"])
-                    symbol.setSizeUnit(QgsUnitTypes.RenderMillimeters)
-                    symbol.changeSymbolLayer(0, svg_layer)
-            case other:  
-                    return None #Not implement
-                
-        render = QgsSingleSymbolRenderer(symbol)
-        return render
+    def _create_single_symbol_style(
+        self, symbology: dict
+    ) -> QgsSingleSymbolRenderer:
+        builder = SINGLE_SYMBOL_BUILDERS.get(symbology["symbol"])
+        if builder is None:
+            return None  # Not implement
 
+        return QgsSingleSymbolRenderer(builder(symbology["properties"]))
 
     def remove_style(self, name: str) -> bool:
-        if name not in self.styles:
+        if not self.style_exists(name):
             return False, f"Style '{name}' does not exist"
 
-        p = QgsProject()
-        p.read(self._qgis_project_uri)
+        # style managers are read even when layers are not resolved
+        p = self._load_project()
+        if p is None:
+            return False, PROJECT_NOT_FOUND
 
+        managers = []
         for layer in p.mapLayers().values():
-            if name == layer.styleManager().currentStyle():
+            manager = layer.styleManager()
+            if name == manager.currentStyle():
                 return False, f"Style is used by {layer.name()}"
+            managers.append(manager)
 
-        for layer in p.mapLayers().values():
-            layer.styleManager().removeStyle(name)
+        for manager in managers:
+            manager.removeStyle(name)
 
         path = self._qgis_project_dir / f"{name}.qml"
         path.unlink()
+        RasterSymbologyRenderer.invalidate_style(path)
 
         p.write()
+        self._clear_cache()
 
         return True, ""
 
+    def _clear_cache(self) -> None:
+        # drop cached listings after the project or its styles changed
+        self.__dict__.pop("layers", None)
+        LAYERS_CACHE.pop(self._qgis_project_uri, None)
+        self._projects.clear()
+        self._layer_indexes.clear()
+
+    @property
+    def _sqlite(self) -> sqlite3.Connection:
+        # opened once per instance, in autocommit mode
+        if self._sqlite_con is None:
+            con = sqlite3.connect(
+                self.sqlite_db.as_posix(), isolation_level=None
+            )
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._sqlite_con = con
+        return self._sqlite_con
+
+    def _layer_index(self, project: QgsProject) -> dict:
+        # built once per cached project, the first layer wins on duplicated names
+        key = id(project)
+        if key not in self._layer_indexes:
+            index = {}
+            for layer in project.mapLayers().values():
+                index.setdefault(layer.name(), layer)
+            self._layer_indexes[key] = index
+        return self._layer_indexes[key]
+
+    def _load_project(self, flags=None) -> QgsProject | None:
+        if flags is None:
+            flags = Qgis.ProjectReadFlag.DontResolveLayers
+
+        key = int(flags)
+        if key not in self._projects:
+            project = QgsProject()
+            if not project.read(self._qgis_project_uri, flags):
+                return None
+            self._projects[key] = project
+        return self._projects[key]
+
+    def _project_header(self) -> dict | None:
+        # a filesystem project not read yet is parsed directly rather than
+        # loaded as a QgsProject just for a few values
+        if (
+            not self._projects
+            and self._storage == StorageBackend.FILESYSTEM
+        ):
+            header = QSAProject._qgs_header(self._qgis_project_uri)
+            if header is not None:
+                return header
+
+        p = self._load_project()
+        if p is None:
+            return None
+
+        return {
+            "author": p.metadata().author(),
+            "creation_datetime": p.metadata()
+            .creationDateTime()
+            .toString(Qt.ISODate),
+            "crs": p.crs().authid(),
+        }
+
     def debug(self, msg: str) -> None:
+        # early break: the caller lookup is only useful when the message
+        # is actually emitted
+        if not logger().isEnabledFor(logging.DEBUG):
+            return
+
         caller = f"{self.__class__.__name__}.{sys._getframe().f_back.f_code.co_name}"
-        if StorageBackend.type() == StorageBackend.FILESYSTEM:
+        if self._storage == StorageBackend.FILESYSTEM:
             msg = f"[{caller}][{self.name}] {msg}"
         else:
             msg = f"[{caller}][{self.schema}:{self.name}] {msg}"
         logger().debug(msg)
 
+    @staticmethod
+    def _psql_projects(uri: str) -> dict:
+        # short-lived cache to avoid listing projects on every exists()
+        ttl = config().qgisserver_projects_psql_cache_ttl
+        if ttl <= 0:
+            return dict.fromkeys(psql_storage().listProjects(uri))
+
+        now = time.monotonic()
+        cached = PSQL_PROJECTS_CACHE.get(uri)
+        if cached and now - cached[0] < ttl:
+            return cached[1]
+
+        projects = dict.fromkeys(psql_storage().listProjects(uri))
+        PSQL_PROJECTS_CACHE[uri] = (now, projects)
+        return projects
+
+    @staticmethod
+    def _psql_uri() -> str:
+        cfg = config()
+        return psql_uri(
+            cfg.qgisserver_projects_psql_dbname,
+            cfg.qgisserver_projects_psql_user,
+            cfg.qgisserver_projects_psql_password,
+            cfg.qgisserver_projects_psql_host,
+            cfg.qgisserver_projects_psql_port,
+        )
+
+    @staticmethod
+    def _qgs_header(path: str) -> dict | None:
+        # stream the .qgs file and stop as soon as the CRS and metadata
+        # elements are parsed, top-level elements are dropped once read
+        header = {}
+        depth = 0
+        root = None
+        try:
+            for event, elem in ET.iterparse(path, events=("start", "end")):
+                if event == "start":
+                    if root is None:
+                        root = elem
+                    depth += 1
+                    continue
+
+                depth -= 1
+                if depth != 1:
+                    continue
+
+                if elem.tag == "projectCrs":
+                    header["crs"] = elem.findtext("spatialrefsys/authid", "")
+                elif elem.tag == "projectMetadata":
+                    header["author"] = elem.findtext("author", "")
+                    header["creation_datetime"] = elem.findtext("creation", "")
+                root.clear()
+
+                if len(header) == 3:
+                    return header
+        except (OSError, ET.ParseError):
+            pass
+        return None
+
+    @staticmethod
+    def _scandir(path: Path | str, suffix: str):
+        # recursive walk relying on cached DirEntry metadata (no Path/stat)
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        yield from QSAProject._scandir(entry.path, suffix)
+                    elif entry.name.endswith(suffix):
+                        yield entry
+        except FileNotFoundError:
+            return
+
     @staticmethod
     def _qgis_projects_dir() -> Path:
         return Path(config().qgisserver_projects_dir)
@@ -883,11 +1055,15 @@ class QSAProject:
             return Qgis.LayerType.Raster
         return None
 
-    @property
+    @cached_property
+    def _storage(self) -> StorageBackend:
+        return StorageBackend.type()
+
+    @cached_property
     def _mapproxy_enabled(self) -> bool:
         return bool(config().mapproxy_projects_dir)
 
-    @property
+    @cached_property
     def _qgis_project_dir(self) -> Path:
         return (
             self._qgis_projects_dir()
@@ -921,27 +1097,14 @@ class QSAProject:
 
     @staticmethod
     def _layer_bbox(lyr) -> list:
-        return list(
-            map(
-                float,
-                lyr.extent()
-                .asWktCoordinates()
-                .replace(",", "")
-                .split(" "),
-            )
-        )
+        e = lyr.extent()
+        return [e.xMinimum(), e.yMinimum(), e.xMaximum(), e.yMaximum()]
 
-    @property
+    @cached_property
     def _qgis_project_uri(self) -> str:
-        if StorageBackend.type() == StorageBackend.POSTGRESQL:
+        if self._storage == StorageBackend.POSTGRESQL:
             self.debug("POSTGRESQL")
-            dbname = config().qgisserver_projects_psql_dbname
-            user = config().qgisserver_projects_psql_user
-            password = config().qgisserver_projects_psql_password
-            host = config().qgisserver_projects_psql_host
-            port = config().qgisserver_projects_psql_port
-            uri = f"postgresql://{user}:{password}@{host}:{port}/{dbname}?sslmode=disable&schema=public&project={self.name}"
-            return uri
+            return f"{QSAProject._psql_uri()}&project={self.name}"
             # service = config().qgisserver_projects_psql_service
             # return f"postgresql:?service={service}&schema={self.schema}&project={self.name}"
         else:
@@ -1,6 +1,7 @@
 # coding: utf8
 
 import sys
+import logging
 from pathlib import Path
 
 from qgis.core import QgsRasterLayer, Qgis
@@ -58,6 +59,11 @@ class RasterOverview:
         return True, ""
 
     def debug(self, msg) -> None:
+        # early break: the caller lookup is only useful when the message
+        # is actually emitted
+        if not logger().isEnabledFor(logging.DEBUG):
+            return
+
         caller = f"{self.__class__.__name__}.{sys._getframe().f_back.f_code.co_name}"
         msg = f"[{caller}] {msg}"
         logger().debug(msg)
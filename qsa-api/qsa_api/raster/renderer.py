@@ -1,7 +1,12 @@
 # coding: utf8
 
+import os
+import copy
+import math
+import time
 from enum import Enum
 from pathlib import Path
+from functools import lru_cache
 
 from qgis.core import (
     QgsStyle,
@@ -21,6 +26,43 @@ ContrastEnhancementAlgorithm = (
     QgsContrastEnhancement.ContrastEnhancementAlgorithm
 )
 
+NO_ENHANCEMENT = ContrastEnhancementAlgorithm.NoEnhancement
+USER_DEFINED_ENHANCEMENT = ContrastEnhancementAlgorithm.UserDefinedEnhancement
+STRETCH_TO_MIN_MAX = ContrastEnhancementAlgorithm.StretchToMinimumMaximum
+
+LIMITS_MIN_MAX = QgsRasterMinMaxOrigin.Limits.MinMax
+LIMITS_USER_DEFINED = QgsRasterMinMaxOrigin.Limits.None_
+
+# band statistics computed with "Accuracy: estimate"
+MIN_MAX_STATS = QgsRasterBandStats.Min | QgsRasterBandStats.Max
+ESTIMATE_SAMPLE_SIZE = 250000
+
+# band min/max indexed by (source, band, mtime): (expiration, (min, max))
+MIN_MAX_CACHE: dict = {}
+MIN_MAX_CACHE_SIZE = 1024
+# lifetime in seconds of min/max for sources without local file (S3, ...)
+MIN_MAX_REMOTE_TTL = 300
+
+EMPTY_TIF = (Path(__file__).resolve().parent / "empty.tif").as_posix()
+
+# raster styles described by style_to_json, indexed by QML path:
+# ((mtime, size), description)
+STYLES_CACHE: dict = {}
+STYLES_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=64)
+def default_style_ramp(name: str):
+    return QgsStyle.defaultStyle().colorRamp(name)
+
+
+def default_color_ramp(name: str):
+    # the shader takes ownership of its ramp, so the cached one is cloned
+    ramp = default_style_ramp(name)
+    if ramp is None:
+        return None
+    return ramp.clone()
+
 
 class RasterSymbologyRenderer:
     class Type(Enum):
@@ -33,7 +75,7 @@ class RasterSymbologyRenderer:
     def __init__(self, name: str) -> None:
         self.renderer = None
         self.contrast_algorithm = None
-        self.contrast_limits = QgsRasterMinMaxOrigin.Limits.MinMax
+        self.contrast_limits = LIMITS_MIN_MAX
 
         self.gray_min = None
         self.gray_max = None
@@ -44,34 +86,13 @@ class RasterSymbologyRenderer:
         self.blue_min = None
         self.blue_max = None
 
-        if name == RasterSymbologyRenderer.Type.SINGLE_BAND_GRAY.value:
-            self.renderer = QgsSingleBandGrayRenderer(None, 1)
-        elif name == RasterSymbologyRenderer.Type.MULTI_BAND_COLOR.value:
-            self.renderer = QgsMultiBandColorRenderer(None, 1, 1, 1)
-        elif (
-            name == RasterSymbologyRenderer.Type.SINGLE_BAND_PSEUDOCOLOR.value
-        ):
-            self.renderer = QgsSingleBandPseudoColorRenderer(None, 1)
+        factory = RENDERER_FACTORIES.get(name)
+        if factory:
+            self.renderer = factory()
 
     @property
     def type(self):
-        if (
-            self.renderer.type()
-            == RasterSymbologyRenderer.Type.SINGLE_BAND_GRAY.value
-        ):
-            return RasterSymbologyRenderer.Type.SINGLE_BAND_GRAY
-        elif (
-            self.renderer.type()
-            == RasterSymbologyRenderer.Type.MULTI_BAND_COLOR.value
-        ):
-            return RasterSymbologyRenderer.Type.MULTI_BAND_COLOR
-        elif (
-            self.renderer.type()
-            == RasterSymbologyRenderer.Type.SINGLE_BAND_PSEUDOCOLOR.value
-        ):
-            return RasterSymbologyRenderer.Type.SINGLE_BAND_PSEUDOCOLOR
-
-        return None
+        return RENDERER_TYPES.get(self.renderer.type())
 
     def load(self, properties: dict) -> (bool, str):
         if not self.renderer:
@@ -93,10 +114,7 @@ class RasterSymbologyRenderer:
         # see QgsRasterMinMaxWidget::doComputations
 
         # early break
-        if (
-            layer.renderer().minMaxOrigin().limits()
-            == QgsRasterMinMaxOrigin.Limits.None_
-        ):
+        if layer.renderer().minMaxOrigin().limits() == LIMITS_USER_DEFINED:
             return
 
         # refresh according to renderer
@@ -109,12 +127,21 @@ class RasterSymbologyRenderer:
 
     @staticmethod
     def style_to_json(path: Path) -> (dict, str):
-        tif = Path(__file__).resolve().parent / "empty.tif"
-        rl = QgsRasterLayer(tif.as_posix(), "", "gdal")
+        # the description only depends on the QML file, so it's reused as
+        # long as the file is unchanged
+        st = path.stat()
+        key = (st.st_mtime_ns, st.st_size)
+        cached = STYLES_CACHE.get(path.as_posix())
+        if cached and cached[0] == key:
+            return copy.deepcopy(cached[1]), ""
+
+        rl = QgsRasterLayer(EMPTY_TIF, "", "gdal")
         rl.loadNamedStyle(path.as_posix())
 
         renderer = rl.renderer()
-        renderer_type = RasterSymbologyRenderer(renderer.type()).type
+        properties = RENDERER_PROPERTIES.get(renderer.type())
+        if properties is None:
+            return {}, f"Unsupported renderer '{renderer.type()}'"
 
         m = {}
         m["name"] = path.stem
@@ -122,24 +149,7 @@ class RasterSymbologyRenderer:
         m["symbology"] = {}
         m["symbology"]["type"] = renderer.type()
 
-        props = {}
-        if renderer_type == RasterSymbologyRenderer.Type.SINGLE_BAND_GRAY:
-            props = RasterSymbologyRenderer._singlebandgray_properties(
-                renderer
-            )
-        elif renderer_type == RasterSymbologyRenderer.Type.MULTI_BAND_COLOR:
-            props = RasterSymbologyRenderer._multibandcolor_properties(
-                renderer
-            )
-        elif (
-            renderer_type
-            == RasterSymbologyRenderer.Type.SINGLE_BAND_PSEUDOCOLOR
-        ):
-            props = RasterSymbologyRenderer._singlebandpseudocolor_properties(
-                renderer
-            )
-
-        m["symbology"]["properties"] = props
+        m["symbology"]["properties"] = properties(renderer)
 
         m["rendering"] = {}
         m["rendering"]["brightness"] = rl.brightnessFilter().brightness()
@@ -147,7 +157,20 @@ class RasterSymbologyRenderer:
         m["rendering"]["gamma"] = rl.brightnessFilter().gamma()
         m["rendering"]["saturation"] = rl.hueSaturationFilter().saturation()
 
-        return m, ""
+        if len(STYLES_CACHE) >= STYLES_CACHE_SIZE:
+            STYLES_CACHE.clear()
+
+        STYLES_CACHE[path.as_posix()] = (key, m)
+        return copy.deepcopy(m), ""
+
+    @staticmethod
+    def invalidate_style(path: Path) -> None:
+        # to call when a QML file, or a directory of QML files, is removed
+        # or overwritten
+        prefix = path.as_posix()
+        for key in list(STYLES_CACHE):
+            if key == prefix or key.startswith(f"{prefix}/"):
+                STYLES_CACHE.pop(key, None)
 
     @staticmethod
     def _multibandcolor_properties(renderer) -> dict:
@@ -158,7 +181,7 @@ class RasterSymbologyRenderer:
 
         props["contrast_enhancement"] = {}
         props["contrast_enhancement"]["limits_min_max"] = "UserDefined"
-        if limits == QgsRasterMinMaxOrigin.Limits.MinMax:
+        if limits == LIMITS_MIN_MAX:
             props["contrast_enhancement"]["limits_min_max"] = "MinMax"
 
         # bands
@@ -171,25 +194,20 @@ class RasterSymbologyRenderer:
         props["green"] = {}
         props["green"]["band"] = renderer.greenBand()
 
-        # red band
-        if renderer.redContrastEnhancement():
-            red_ce = QgsContrastEnhancement(renderer.redContrastEnhancement())
-
+        # red band, contrast enhancements are only read so they're not copied
+        red_ce = renderer.redContrastEnhancement()
+        if red_ce:
             props["red"]["min"] = red_ce.minimumValue()
             props["red"]["max"] = red_ce.maximumValue()
 
             # blue band
-            blue_ce = QgsContrastEnhancement(
-                renderer.blueContrastEnhancement()
-            )
+            blue_ce = renderer.blueContrastEnhancement()
 
             props["blue"]["min"] = blue_ce.minimumValue()
             props["blue"]["max"] = blue_ce.maximumValue()
 
             # green band
-            green_ce = QgsContrastEnhancement(
-                renderer.greenContrastEnhancement()
-            )
+            green_ce = renderer.greenContrastEnhancement()
 
             props["green"]["min"] = green_ce.minimumValue()
             props["green"]["max"] = green_ce.maximumValue()
@@ -197,10 +215,7 @@ class RasterSymbologyRenderer:
             # ce
             alg = red_ce.contrastEnhancementAlgorithm()
             props["contrast_enhancement"]["algorithm"] = "NoEnhancement"
-            if (
-                alg
-                == QgsContrastEnhancement.ContrastEnhancementAlgorithm.StretchToMinimumMaximum
-            ):
+            if alg == STRETCH_TO_MIN_MAX:
                 props["contrast_enhancement"][
                     "algorithm"
                 ] = "StretchToMinimumMaximum"
@@ -233,17 +248,14 @@ class RasterSymbologyRenderer:
 
         alg = ce.contrastEnhancementAlgorithm()
         props["contrast_enhancement"]["algorithm"] = "NoEnhancement"
-        if (
-            alg
-            == QgsContrastEnhancement.ContrastEnhancementAlgorithm.StretchToMinimumMaximum
-        ):
+        if alg == STRETCH_TO_MIN_MAX:
             props["contrast_enhancement"][
                 "algorithm"
             ] = "StretchToMinimumMaximum"
 
         limits = renderer.minMaxOrigin().limits()
         props["contrast_enhancement"]["limits_min_max"] = "UserDefined"
-        if limits == QgsRasterMinMaxOrigin.Limits.MinMax:
+        if limits == LIMITS_MIN_MAX:
             props["contrast_enhancement"]["limits_min_max"] = "MinMax"
 
         return props
@@ -289,7 +301,7 @@ class RasterSymbologyRenderer:
 
         limits = renderer.minMaxOrigin().limits()
         props["contrast_enhancement"]["limits_min_max"] = "UserDefined"
-        if limits == QgsRasterMinMaxOrigin.Limits.MinMax:
+        if limits == LIMITS_MIN_MAX:
             props["contrast_enhancement"]["limits_min_max"] = "MinMax"
 
         return props
@@ -302,100 +314,96 @@ class RasterSymbologyRenderer:
 
         # early break
         alg = red_ce.contrastEnhancementAlgorithm()
-        if (
-            alg == ContrastEnhancementAlgorithm.NoEnhancement
-            or alg == ContrastEnhancementAlgorithm.UserDefinedEnhancement
-        ):
+        if alg in (NO_ENHANCEMENT, USER_DEFINED_ENHANCEMENT):
             return
 
         # compute min/max with "Accuracy: estimate"
         min_max_origin = renderer.minMaxOrigin().limits()
-        if min_max_origin == QgsRasterMinMaxOrigin.Limits.MinMax:
-            red_band = renderer.redBand()
-            red_stats = layer.dataProvider().bandStatistics(
-                red_band,
-                QgsRasterBandStats.Min | QgsRasterBandStats.Max,
-                layer.extent(),
-                250000,
-            )
-            red_ce.setMinimumValue(red_stats.minimumValue)
-            red_ce.setMaximumValue(red_stats.maximumValue)
-
-            green_band = renderer.greenBand()
-            green_stats = layer.dataProvider().bandStatistics(
-                green_band,
-                QgsRasterBandStats.Min | QgsRasterBandStats.Max,
-                layer.extent(),
-                250000,
-            )
-            green_ce.setMinimumValue(green_stats.minimumValue)
-            green_ce.setMaximumValue(green_stats.maximumValue)
-
-            blue_band = renderer.blueBand()
-            blue_stats = layer.dataProvider().bandStatistics(
-                blue_band,
-                QgsRasterBandStats.Min | QgsRasterBandStats.Max,
-                layer.extent(),
-                250000,
-            )
-            blue_ce.setMinimumValue(blue_stats.minimumValue)
-            blue_ce.setMaximumValue(blue_stats.maximumValue)
+        if min_max_origin == LIMITS_MIN_MAX:
+            # bands shared between channels are only scanned once
+            for band, ce in (
+                (renderer.redBand(), red_ce),
+                (renderer.greenBand(), green_ce),
+                (renderer.blueBand(), blue_ce),
+            ):
+                band_min, band_max = self._band_min_max(layer, band)
+                ce.setMinimumValue(band_min)
+                ce.setMaximumValue(band_max)
 
         layer.renderer().setRedContrastEnhancement(red_ce)
         layer.renderer().setGreenContrastEnhancement(green_ce)
         layer.renderer().setBlueContrastEnhancement(blue_ce)
 
     def _refresh_min_max_singlebandgray(self, layer: QgsRasterLayer) -> None:
-        ce = QgsContrastEnhancement(layer.renderer().contrastEnhancement())
+        renderer = layer.renderer()
 
         # early break
-        alg = ce.contrastEnhancementAlgorithm()
-        if (
-            alg == ContrastEnhancementAlgorithm.NoEnhancement
-            or alg == ContrastEnhancementAlgorithm.UserDefinedEnhancement
-        ):
+        alg = renderer.contrastEnhancement().contrastEnhancementAlgorithm()
+        if alg in (NO_ENHANCEMENT, USER_DEFINED_ENHANCEMENT):
             return
 
-        # compute min/max
-        min_max_origin = layer.renderer().minMaxOrigin().limits()
-        if min_max_origin == QgsRasterMinMaxOrigin.Limits.MinMax:
-            # Accuracy : estimate
-            stats = layer.dataProvider().bandStatistics(
-                1,
-                QgsRasterBandStats.Min | QgsRasterBandStats.Max,
-                layer.extent(),
-                250000,
-            )
-
-            ce.setMinimumValue(stats.minimumValue)
-            ce.setMaximumValue(stats.maximumValue)
-
-        layer.renderer().setContrastEnhancement(ce)
+        # compute min/max, the enhancement is only copied when updated
+        min_max_origin = renderer.minMaxOrigin().limits()
+        if min_max_origin == LIMITS_MIN_MAX:
+            ce = QgsContrastEnhancement(renderer.contrastEnhancement())
+            band_min, band_max = self._band_min_max(layer, 1)
+            ce.setMinimumValue(band_min)
+            ce.setMaximumValue(band_max)
+            renderer.setContrastEnhancement(ce)
 
     def _refresh_min_max_singlebandpseudocolor(
         self, layer: QgsRasterLayer
     ) -> None:
         # compute min/max
         min_max_origin = layer.renderer().minMaxOrigin().limits()
-        if min_max_origin == QgsRasterMinMaxOrigin.Limits.MinMax:
-            # Accuracy : estimate
-            stats = layer.dataProvider().bandStatistics(
-                1,
-                QgsRasterBandStats.Min | QgsRasterBandStats.Max,
-                layer.extent(),
-                250000,
-            )
-
-            layer.renderer().setClassificationMin(stats.minimumValue)
-            layer.renderer().setClassificationMax(stats.maximumValue)
+        if min_max_origin == LIMITS_MIN_MAX:
+            band_min, band_max = self._band_min_max(layer, 1)
+            layer.renderer().setClassificationMin(band_min)
+            layer.renderer().setClassificationMax(band_max)
             layer.renderer().shader().rasterShaderFunction().classifyColorRamp()
 
+    @staticmethod
+    def _band_min_max(layer: QgsRasterLayer, band: int) -> (float, float):
+        # local rasters are keyed on their modification time, remote ones
+        # cannot be checked and expire instead
+        source = layer.source()
+        try:
+            mtime = os.stat(source).st_mtime_ns
+        except OSError:
+            mtime = None
+
+        now = time.monotonic()
+        key = (source, band, mtime)
+        cached = MIN_MAX_CACHE.get(key)
+        if cached is not None and now < cached[0]:
+            return cached[1]
+
+        stats = layer.dataProvider().bandStatistics(
+            band, MIN_MAX_STATS, layer.extent(), ESTIMATE_SAMPLE_SIZE
+        )
+        min_max = (stats.minimumValue, stats.maximumValue)
+
+        if len(MIN_MAX_CACHE) >= MIN_MAX_CACHE_SIZE:
+            MIN_MAX_CACHE.clear()
+
+        expiration = math.inf
+        if mtime is None:
+            expiration = now + MIN_MAX_REMOTE_TTL
+        MIN_MAX_CACHE[key] = (expiration, min_max)
+        return min_max
+
+    @staticmethod
+    def invalidate_min_max(source: str) -> None:
+        # to call when a raster is overwritten in place
+        for key in [k for k in MIN_MAX_CACHE if k[0] == source]:
+            MIN_MAX_CACHE.pop(key, None)
+
     def _load_multibandcolor_properties(self, properties: dict) -> None:
         if "red" in properties:
             red = properties["red"]
             self.renderer.setRedBand(int(red["band"]))
 
-            if self.contrast_limits == QgsRasterMinMaxOrigin.Limits.None_:
+            if self.contrast_limits == LIMITS_USER_DEFINED:
                 if "min" in red:
                     self.red_min = float(red["min"])
 
@@ -406,7 +414,7 @@ class RasterSymbologyRenderer:
             blue = properties["blue"]
             self.renderer.setBlueBand(int(blue["band"]))
 
-            if self.contrast_limits == QgsRasterMinMaxOrigin.Limits.None_:
+            if self.contrast_limits == LIMITS_USER_DEFINED:
                 if "min" in blue:
                     self.blue_min = float(blue["min"])
 
@@ -417,7 +425,7 @@ class RasterSymbologyRenderer:
             green = properties["green"]
             self.renderer.setGreenBand(int(green["band"]))
 
-            if self.contrast_limits == QgsRasterMinMaxOrigin.Limits.None_:
+            if self.contrast_limits == LIMITS_USER_DEFINED:
                 if "min" in green:
                     self.green_min = float(green["min"])
 
@@ -429,7 +437,7 @@ class RasterSymbologyRenderer:
             gray = properties["gray"]
             self.renderer.setGrayBand(int(gray["band"]))
 
-            if self.contrast_limits == QgsRasterMinMaxOrigin.Limits.None_:
+            if self.contrast_limits == LIMITS_USER_DEFINED:
                 if "min" in gray:
                     self.gray_min = float(gray["min"])
 
@@ -449,9 +457,7 @@ class RasterSymbologyRenderer:
 
     def _load_singlebandpseudocolor_properties(self, properties: dict) -> None:
         # always stretch to min/max in case of the singlepseudocolor renderer
-        self.contrast_algorithm = (
-            ContrastEnhancementAlgorithm.StretchToMinimumMaximum
-        )
+        self.contrast_algorithm = STRETCH_TO_MIN_MAX
 
         band_min = None
         band_max = None
@@ -459,7 +465,7 @@ class RasterSymbologyRenderer:
             band = properties["band"]
             self.renderer.setBand(int(band["band"]))
 
-            if self.contrast_limits == QgsRasterMinMaxOrigin.Limits.None_:
+            if self.contrast_limits == LIMITS_USER_DEFINED:
                 if "min" in band:
                     band_min = float(band["min"])
 
@@ -476,11 +482,12 @@ class RasterSymbologyRenderer:
                 elif interpolation == "Exact":
                     shader_type = QgsColorRampShader.Type.Exact
 
-            color_ramp = QgsStyle().defaultStyle().colorRamp("Spectral")
             if "name" in ramp and ramp["name"]:
-                color_ramp = QgsStyle().defaultStyle().colorRamp(ramp["name"])
+                color_ramp = default_color_ramp(ramp["name"])
             elif "color1" in ramp and "color2" in ramp:
                 color_ramp = QgsGradientColorRamp.create(ramp)
+            else:
+                color_ramp = default_color_ramp("Spectral")
 
             ramp_shader = QgsColorRampShader()
             ramp_shader.setSourceColorRamp(color_ramp)
@@ -501,17 +508,41 @@ class RasterSymbologyRenderer:
         if "algorithm" in properties:
             alg = properties["algorithm"]
             if alg == "StretchToMinimumMaximum":
-                self.contrast_algorithm = (
-                    ContrastEnhancementAlgorithm.StretchToMinimumMaximum
-                )
+                self.contrast_algorithm = STRETCH_TO_MIN_MAX
             elif alg == "NoEnhancement":
-                self.contrast_algorithm = (
-                    ContrastEnhancementAlgorithm.NoEnhancement
-                )
+                self.contrast_algorithm = NO_ENHANCEMENT
 
         if "limits_min_max" in properties:
             limits = properties["limits_min_max"]
             if limits == "UserDefined":
-                self.contrast_limits = QgsRasterMinMaxOrigin.Limits.None_
+                self.contrast_limits = LIMITS_USER_DEFINED
             elif limits == "MinMax":
-                self.contrast_limits = QgsRasterMinMaxOrigin.Limits.MinMax
+                self.contrast_limits = LIMITS_MIN_MAX
+
+
+# renderer types and constructors indexed by QGIS renderer type name
+RENDERER_TYPES = {t.value: t for t in RasterSymbologyRenderer.Type}
+RENDERER_FACTORIES = {
+    RasterSymbologyRenderer.Type.SINGLE_BAND_GRAY.value: (
+        lambda: QgsSingleBandGrayRenderer(None, 1)
+    ),
+    RasterSymbologyRenderer.Type.MULTI_BAND_COLOR.value: (
+        lambda: QgsMultiBandColorRenderer(None, 1, 1, 1)
+    ),
+    RasterSymbologyRenderer.Type.SINGLE_BAND_PSEUDOCOLOR.value: (
+        lambda: QgsSingleBandPseudoColorRenderer(None, 1)
+    ),
+}
+
+# style_to_json properties readers indexed by QGIS renderer type name
+RENDERER_PROPERTIES = {
+    RasterSymbologyRenderer.Type.SINGLE_BAND_GRAY.value: (
+        RasterSymbologyRenderer._singlebandgray_properties
+    ),
+    RasterSymbologyRenderer.Type.MULTI_BAND_COLOR.value: (
+        RasterSymbologyRenderer._multibandcolor_properties
+    ),
+    RasterSymbologyRenderer.Type.SINGLE_BAND_PSEUDOCOLOR.value: (
+        RasterSymbologyRenderer._singlebandpseudocolor_properties
+    ),
+}
@@ -3,11 +3,18 @@
 import os
 import sys
 import boto3
+import uuid
+import orjson
+import decimal
+import dataclasses
 import logging
 import threading
 from enum import Enum
 from pathlib import Path
+from datetime import date
 from flask import current_app
+from flask.json.provider import JSONProvider
+from werkzeug.http import http_date
 from botocore.exceptions import ClientError
 
 from .config import QSAConfig
@@ -29,6 +36,57 @@ def s3_parse_uri(uri: str):
     return bucket, subdirs, filename
 
 
+def _json_default(o):
+    # same conversions as the default Flask provider
+    if isinstance(o, date):
+        return http_date(o)
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(
+        f"Object of type {type(o).__name__} is not JSON serializable"
+    )
+
+
+class QSAJSONProvider(JSONProvider):
+    # orjson based provider, keys are sorted like with the default provider,
+    # datetimes are HTTP dates and responses are indented in debug mode.
+    # Unlike the default provider, NaN and Infinity are serialized as null.
+    options = (
+        orjson.OPT_SORT_KEYS
+        | orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+
+    # same meaning as DefaultJSONProvider.compact
+    compact: bool | None = None
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(
+            obj, default=_json_default, option=self.options
+        ).decode()
+
+    def loads(self, s: str | bytes, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        options = self.options
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            options |= orjson.OPT_INDENT_2
+
+        # trailing newline like jsonify
+        body = orjson.dumps(obj, default=_json_default, option=options)
+        return self._app.response_class(
+            body + b"\n",
+            mimetype="application/json",
+        )
+
+
 class StorageBackend(Enum):
     FILESYSTEM = 0
     POSTGRESQL = 1
@@ -1,14 +1,33 @@
 # coding: utf8
 
+from collections import OrderedDict
+
 from .project import QSAProject
 from .utils import qgisserver_base_url
 
 
+# GetMap query strings kept for the most recently used layers
+URLS_CACHE_SIZE = 4096
+
+
 class WMS:
+    # GetMap query strings indexed by (project, schema, layer), least
+    # recently used first
+    _urls: OrderedDict = OrderedDict()
+
     @staticmethod
     def getmap_url(project, psql_schema, layer):
+        key = (project, psql_schema, layer)
+        url = WMS._urls.get(key)
+        if url is not None:
+            try:
+                WMS._urls.move_to_end(key)
+            except KeyError:
+                pass  # cleared meanwhile
+            return url
+
         p = QSAProject(project, psql_schema)
-        props = p.layer(layer)
+        props, _ = p.layer(layer)
 
         if "bbox" not in props:
             return "Invalid layer"
@@ -16,8 +35,22 @@ class WMS:
         bbox = props["bbox"].replace(" ", ",").replace(",,", ",").split(",")
         wms_bbox = f"{bbox[1]},{bbox[0]},{bbox[3]},{bbox[2]}"
 
-        return f"REQUEST=GetMap&WIDTH=400&HEIGHT=400&CRS={props['crs']}&VERSION=1.3.0&BBOX={wms_bbox}&LAYERS={layer}"
+        url = f"REQUEST=GetMap&WIDTH=400&HEIGHT=400&CRS={props['crs']}&VERSION=1.3.0&BBOX={wms_bbox}&LAYERS={layer}"
+        WMS._urls[key] = url
+        while len(WMS._urls) > URLS_CACHE_SIZE:
+            try:
+                WMS._urls.popitem(last=False)
+            except KeyError:
+                break
+        return url
 
     @staticmethod
     def getmap(project, psql_schema, layer):
         return f"{qgisserver_base_url(project, psql_schema)}{WMS.getmap_url(project, psql_schema, layer)}"
+
+    @staticmethod
+    def clear_cache(project, psql_schema, layer=None) -> None:
+        # layer is None: forget every layer of the project
+        for key in list(WMS._urls):
+            if key[:2] == (project, psql_schema) and layer in (None, key[2]):
+                WMS._urls.pop(key, None)
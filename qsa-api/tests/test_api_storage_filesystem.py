@@ -1,8 +1,14 @@
 import os
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from .utils import TestClient
+from .utils import (
+    TestClient,
+    PROJECTS_DIR,
+    TEST_PROJECT_0,
+    TEST_PROJECT_1,
+)
 
 GPKG = Path(__file__).parent / "data.gpkg"
 if "QSA_GPKG" in os.environ:
@@ -12,48 +18,84 @@ GEOTIFF = Path(__file__).parent / "landsat_4326.tif"
 if "QSA_GEOTIFF" in os.environ:
     GEOTIFF = os.environ["QSA_GEOTIFF"]
 
-TEST_PROJECT_0 = "qsa_test_project0"
-TEST_PROJECT_1 = "qsa_test_project1"
+# layer definitions, completed with a name and a CRS by tests
+LAYER_POLYGONS = {
+    "datasource": f"{GPKG}|layername=polygons",
+    "type": "vector",
+}
+LAYER_LINES = {"datasource": f"{GPKG}|layername=lines", "type": "vector"}
+LAYER_POINTS = {"datasource": f"{GPKG}|layername=points", "type": "vector"}
+LAYER_RASTER = {"datasource": f"{GEOTIFF}", "type": "raster"}
 
+# API URLs of test projects
+PROJECT_0 = f"/api/projects/{TEST_PROJECT_0}"
+PROJECT_0_LAYERS = f"{PROJECT_0}/layers"
+PROJECT_0_STYLES = f"{PROJECT_0}/styles"
+PROJECT_1 = f"/api/projects/{TEST_PROJECT_1}"
+PROJECT_1_LAYERS = f"{PROJECT_1}/layers"
+PROJECT_1_STYLES = f"{PROJECT_1}/styles"
 
-class APITestCaseFilesystem(unittest.TestCase):
-    def setUp(self):
-        self.app = TestClient("/tmp/qsa/projects/qgis")
 
-    def test_projects(self):
-        # no projects
-        p = self.app.get("/api/projects/")
-        self.assertTrue(TEST_PROJECT_0 not in p.get_json())
-        self.assertTrue(TEST_PROJECT_1 not in p.get_json())
+class APITestCaseFilesystem(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = TestClient(PROJECTS_DIR)
 
-        # add projects
+        # project shared by tests, which use their own layers and styles
         data = {}
         data["name"] = TEST_PROJECT_0
         data["author"] = "pblottiere"
-        p = self.app.post("/api/projects/", data)
-        self.assertEqual(p.status_code, 201)
+        p = cls.app.post("/api/projects/", data)
+        if p.status_code != 201:
+            raise RuntimeError(
+                f"Cannot create {TEST_PROJECT_0}: {p.status_code} {p.text}"
+            )
 
+    @classmethod
+    def tearDownClass(cls):
+        p = cls.app.delete(PROJECT_0)
+        if p.status_code != 201:
+            raise RuntimeError(
+                f"Cannot remove {TEST_PROJECT_0}: {p.status_code} {p.text}"
+            )
+
+    def layer(self, idx):
+        return f"layer_{self._testMethodName}_{idx}"
+
+    def style(self, name):
+        return f"style_{self._testMethodName}_{name}"
+
+    def own(self, names):
+        # layers or styles created by the running test
+        tag = f"_{self._testMethodName}_"
+        return [n for n in names if tag in n]
+
+    def remove_project(self, url):
+        p = self.app.delete(url)
+        self.assertEqual(p.status_code, 201, p.text)
+
+    def test_projects(self):
+        # shared project only
+        p = self.app.get("/api/projects/")
+        j = p.get_json()
+        self.assertTrue(TEST_PROJECT_0 in j)
+        self.assertTrue(TEST_PROJECT_1 not in j)
+
+        # add project
         data = {}
-        data["name"] = "qsa_test_project1"
+        data["name"] = TEST_PROJECT_1
         data["author"] = "pblottiere"
         p = self.app.post("/api/projects/", data)
         self.assertEqual(p.status_code, 201)
 
         # 2 projects
         p = self.app.get("/api/projects/")
-        self.assertTrue(TEST_PROJECT_0 in p.get_json())
-        self.assertTrue(TEST_PROJECT_1 in p.get_json())
-
-        # remove project
-        p = self.app.delete(f"/api/projects/{TEST_PROJECT_0}")
-        self.assertEqual(p.status_code, 201)
-
-        # 1 projects
-        p = self.app.get("/api/projects/")
-        self.assertTrue(TEST_PROJECT_1 in p.get_json())
+        j = p.get_json()
+        self.assertTrue(TEST_PROJECT_0 in j)
+        self.assertTrue(TEST_PROJECT_1 in j)
 
         # get info about project
-        p = self.app.get(f"/api/projects/{TEST_PROJECT_1}")
+        p = self.app.get(PROJECT_1)
         j = p.get_json()
         self.assertTrue("crs" in j)
         self.assertTrue("creation_datetime" in j)
@@ -61,144 +103,79 @@ class APITestCaseFilesystem(unittest.TestCase):
         self.assertEqual(j["storage"], "filesystem")
         self.assertFalse("schema" in j)
 
-        # remove last project
-        p = self.app.delete(f"/api/projects/{TEST_PROJECT_1}")
-
-    def test_vector_symbology_line(self):
-        # access symbol properties
-        p = self.app.get(
-            "/api/symbology/vector/line/single_symbol/line/properties"
-        )
-        j = p.get_json()
-        self.assertTrue("line_width" in j)
-
-    def test_vector_symbology_fill(self):
-        # list symbology for fill geometries
-        p = self.app.get(
-            "/api/symbology/vector/polygon/single_symbol/fill/properties"
-        )
-        j = p.get_json()
-        self.assertTrue("outline_style" in j)
-
-    def test_vector_symbology_marker(self):
-        # list symbology for marker geometries
-        p = self.app.get(
-            "/api/symbology/vector/point/single_symbol/marker/properties"
-        )
-        j = p.get_json()
-        self.assertTrue("outline_style" in j)
-
-    def test_vector_symbology_rendering(self):
-        p = self.app.get("/api/symbology/vector/rendering/properties")
-        j = p.get_json()
-        self.assertTrue("opacity" in j)
-
-    def test_raster_symbology_rendering(self):
-        p = self.app.get("/api/symbology/raster/rendering/properties")
-        j = p.get_json()
-        self.assertTrue("gamma" in j)
-        self.assertTrue("brightness" in j)
-        self.assertTrue("contrast" in j)
-        self.assertTrue("saturation" in j)
-
-    def test_raster_symbology_singlebandgray(self):
-        p = self.app.get("/api/symbology/raster/singlebandgray/properties")
-        j = p.get_json()
-        self.assertTrue("gray" in j)
-        self.assertTrue("contrast_enhancement" in j)
+        # remove project
+        p = self.app.delete(PROJECT_1)
+        self.assertEqual(p.status_code, 201)
 
-    def test_raster_symbology_multibandcolor(self):
-        p = self.app.get("/api/symbology/raster/multibandcolor/properties")
+        # 1 project
+        p = self.app.get("/api/projects/")
         j = p.get_json()
-        self.assertTrue("contrast_enhancement" in j)
+        self.assertTrue(TEST_PROJECT_0 in j)
+        self.assertTrue(TEST_PROJECT_1 not in j)
 
     def test_layers(self):
-        # add project
-        data = {}
-        data["name"] = TEST_PROJECT_0
-        data["author"] = "pblottiere"
-        p = self.app.post("/api/projects/", data)
-        self.assertEqual(p.status_code, 201)
+        layer0 = self.layer(0)
+        layer1 = self.layer(1)
+        layer2 = self.layer(2)
+        layer3 = self.layer(3)
 
         # 0 layer
-        p = self.app.get(f"/api/projects/{TEST_PROJECT_0}/layers")
-        self.assertEqual(p.get_json(), [])
+        p = self.app.get(PROJECT_0_LAYERS)
+        self.assertEqual(self.own(p.get_json()), [])
 
-        # add layer
-        data = {}
-        data["name"] = "layer0"
-        data["datasource"] = f"{GPKG}|layername=polygons"
-        data["crs"] = 4326
-        data["type"] = "vector"
-        p = self.app.post(f"/api/projects/{TEST_PROJECT_0}/layers", data)
-        self.assertEqual(p.status_code, 201)
+        # add layers
+        layers = []
 
-        data = {}
-        data["name"] = "layer1"
-        data["datasource"] = f"{GPKG}|layername=lines"
-        # data["crs"] = 4326  # No CRS because it's optional
-        data["type"] = "vector"
-        p = self.app.post(f"/api/projects/{TEST_PROJECT_0}/layers", data)
-        self.assertEqual(p.status_code, 201)
+        data = {**LAYER_POLYGONS, "name": layer0, "crs": 4326}
+        layers.append(data)
 
-        data = {}
-        data["name"] = "layer2"
-        data["datasource"] = f"{GPKG}|layername=points"
-        data["crs"] = 4326
-        data["type"] = "vector"
-        p = self.app.post(f"/api/projects/{TEST_PROJECT_0}/layers", data)
-        self.assertEqual(p.status_code, 201)
+        data = {**LAYER_LINES, "name": layer1}  # No CRS because it's optional
+        layers.append(data)
 
-        data = {}
-        data["name"] = "layer3"
-        data["datasource"] = f"{GEOTIFF}"
-        data["crs"] = 4326
-        data["type"] = "raster"
-        p = self.app.post(f"/api/projects/{TEST_PROJECT_0}/layers", data)
+        data = {**LAYER_POINTS, "name": layer2, "crs": 4326}
+        layers.append(data)
+
+        data = {**LAYER_RASTER, "name": layer3, "crs": 4326}
+        layers.append(data)
+
+        p = self.app.post_batch(PROJECT_0_LAYERS, layers)
         self.assertEqual(p.status_code, 201)
 
         # 3 layers
-        p = self.app.get(f"/api/projects/{TEST_PROJECT_0}/layers")
+        p = self.app.get(PROJECT_0_LAYERS)
         self.assertEqual(
-            p.get_json(), ["layer0", "layer1", "layer2", "layer3"]
+            self.own(p.get_json()), [layer0, layer1, layer2, layer3]
         )
 
         # layer metadata
-        p = self.app.get(f"/api/projects/{TEST_PROJECT_0}/layers/layer1")
+        p = self.app.get(f"{PROJECT_0_LAYERS}/{layer1}")
         j = p.get_json()
         self.assertEqual(j["type"], "vector")
 
-        p = self.app.get(f"/api/projects/{TEST_PROJECT_0}/layers/layer2")
+        p = self.app.get(f"{PROJECT_0_LAYERS}/{layer2}")
         j = p.get_json()
         self.assertEqual(j["valid"], True)
 
         # remove layer0
-        p = self.app.delete(f"/api/projects/{TEST_PROJECT_0}/layers/layer0")
+        p = self.app.delete(f"{PROJECT_0_LAYERS}/{layer0}")
         self.assertEqual(p.status_code, 201)
 
         # 2 layer
-        p = self.app.get(f"/api/projects/{TEST_PROJECT_0}/layers")
-        self.assertEqual(p.get_json(), ["layer1", "layer2", "layer3"])
-
-        # remove last project
-        p = self.app.delete(f"/api/projects/{TEST_PROJECT_0}")
+        p = self.app.get(PROJECT_0_LAYERS)
+        self.assertEqual(self.own(p.get_json()), [layer1, layer2, layer3])
 
     def test_raster_style(self):
-        # add project
-        data = {}
-        data["name"] = TEST_PROJECT_0
-        data["author"] = "pblottiere"
-        p = self.app.post("/api/projects/", data)
-        self.assertEqual(p.status_code, 201)
+        layer0 = self.layer(0)
+        style_multibandcolor = self.style("multibandcolor")
 
         # 0 style
-        p = self.app.get(f"/api/projects/{TEST_PROJECT_0}/styles")
-        self.assertEqual(p.get_json(), [])
+        p = self.app.get(PROJECT_0_STYLES)
+        self.assertEqual(self.own(p.get_json()), [])
 
         # add multibandcolor style to project
         data = {}
         data["type"] = "raster"
-        data["name"] = "style_multibandcolor"
+        data["name"] = style_multibandcolor
         data["symbology"] = {"type": "multibandcolor"}
         data["symbology"]["properties"] = {
             "red": {"band": 1},
@@ -211,190 +188,168 @@ class APITestCaseFilesystem(unittest.TestCase):
             "contrast": 3,
             "saturation": 2,
         }
-        p = self.app.post(f"/api/projects/{TEST_PROJECT_0}/styles", data)
+        p = self.app.post(PROJECT_0_STYLES, data)
         self.assertEqual(p.status_code, 201)
 
-        p = self.app.get(
-            f"/api/projects/{TEST_PROJECT_0}/styles/style_multibandcolor"
-        )
-        self.assertTrue("rendering" in p.get_json())
-        self.assertTrue("symbology" in p.get_json())
-        self.assertTrue("properties" in p.get_json()["symbology"])
+        p = self.app.get(f"{PROJECT_0_STYLES}/{style_multibandcolor}")
+        j = p.get_json()
+        self.assertTrue("rendering" in j)
+        self.assertTrue("symbology" in j)
+        self.assertTrue("properties" in j["symbology"])
 
         # 1 style
-        p = self.app.get(f"/api/projects/{TEST_PROJECT_0}/styles")
-        self.assertTrue("style_multibandcolor" in p.get_json())
+        p = self.app.get(PROJECT_0_STYLES)
+        self.assertTrue(style_multibandcolor in p.get_json())
 
         # add raster layer
-        data = {}
-        data["name"] = "layer0"
-        data["datasource"] = f"{GEOTIFF}"
-        data["crs"] = 4326
-        data["type"] = "raster"
-        p = self.app.post(f"/api/projects/{TEST_PROJECT_0}/layers", data)
+        data = {**LAYER_RASTER, "name": layer0, "crs": 4326}
+        p = self.app.post(PROJECT_0_LAYERS, data)
         self.assertEqual(p.status_code, 201)
 
         # update layer's style
         data = {}
         data["current"] = True
-        data["name"] = "style_multibandcolor"
-        p = self.app.post(
-            f"/api/projects/{TEST_PROJECT_0}/layers/layer0/style", data
-        )
+        data["name"] = style_multibandcolor
+        p = self.app.post(f"{PROJECT_0_LAYERS}/{layer0}/style", data)
         self.assertEqual(p.status_code, 201)
 
         # check style for layers
-        p = self.app.get(f"/api/projects/{TEST_PROJECT_0}/layers/layer0")
+        p = self.app.get(f"{PROJECT_0_LAYERS}/{layer0}")
         j = p.get_json()
-        self.assertEqual(j["styles"], ["default", "style_multibandcolor"])
-        self.assertEqual(j["current_style"], "style_multibandcolor")
+        self.assertEqual(j["styles"], ["default", style_multibandcolor])
+        self.assertEqual(j["current_style"], style_multibandcolor)
 
         # remove style
-        p = self.app.delete(
-            f"/api/projects/{TEST_PROJECT_0}/styles/style_multibandcolor"
-        )
+        p = self.app.delete(f"{PROJECT_0_STYLES}/{style_multibandcolor}")
         self.assertEqual(p.status_code, 415)  # style still in use
 
         # update layer's style
         data = {}
         data["current"] = True
         data["name"] = "default"
-        p = self.app.post(
-            f"/api/projects/{TEST_PROJECT_0}/layers/layer0/style", data
-        )
+        p = self.app.post(f"{PROJECT_0_LAYERS}/{layer0}/style", data)
         self.assertEqual(p.status_code, 201)
 
         # remove style
-        p = self.app.delete(
-            f"/api/projects/{TEST_PROJECT_0}/styles/style_multibandcolor"
-        )
+        p = self.app.delete(f"{PROJECT_0_STYLES}/{style_multibandcolor}")
         self.assertEqual(p.status_code, 201)
 
         # 0 style
-        p = self.app.get(f"/api/projects/{TEST_PROJECT_0}/styles")
-        self.assertEqual(p.get_json(), [])
-
-        # remove last project
-        p = self.app.delete(f"/api/projects/{TEST_PROJECT_0}")
+        p = self.app.get(PROJECT_0_STYLES)
+        self.assertEqual(self.own(p.get_json()), [])
 
     def test_vector_style(self):
-        # add project
-        data = {}
-        data["name"] = TEST_PROJECT_0
-        data["author"] = "pblottiere"
-        p = self.app.post("/api/projects/", data)
-        self.assertEqual(p.status_code, 201)
+        layer0 = self.layer(0)
+        layer1 = self.layer(1)
+        style_line = self.style("line")
+        style_fill = self.style("fill")
 
         # 0 style
-        p = self.app.get(f"/api/projects/{TEST_PROJECT_0}/styles")
-        self.assertEqual(p.get_json(), [])
+        p = self.app.get(PROJECT_0_STYLES)
+        self.assertEqual(self.own(p.get_json()), [])
 
         # add line style to project
         data = {}
         data["type"] = "vector"
-        data["name"] = "style_line"
+        data["name"] = style_line
         data["symbology"] = {"type": "single_symbol", "symbol": "line"}
-        data["symbology"]["properties"] = {"outline_width": 0.5}
-        data["symbology"]["properties"] = {"outline_style": "dash"}
-        data["symbology"]["properties"] = {"outline_color": "#FF00FF"}
+        data["symbology"]["properties"] = {
+            "outline_width": 0.5,
+            "outline_style": "dash",
+            "outline_color": "#FF00FF",
+        }
         data["rendering"] = {"opacity": 0.4}
-        p = self.app.post(f"/api/projects/{TEST_PROJECT_0}/styles", data)
+        p = self.app.post(PROJECT_0_STYLES, data)
         self.assertEqual(p.status_code, 201)
 
         # add fill style to project
         data = {}
         data["type"] = "vector"
-        data["name"] = "style_fill"
+        data["name"] = style_fill
         data["symbology"] = {"type": "single_symbol", "symbol": "fill"}
-        data["symbology"]["properties"] = {"outline_width": 0.5}
+        data["symbology"]["properties"] = {
+            "color": "#00BBBB",
+            "outline_width": 0.5,
+            "outline_style": "solid",
+            "outline_color": "#002222",
+        }
         data["rendering"] = {}
-        p = self.app.post(f"/api/projects/{TEST_PROJECT_0}/styles", data)
+        p = self.app.post(PROJECT_0_STYLES, data)
         self.assertEqual(p.status_code, 201)
 
         # 2 styles
-        p = self.app.get(f"/api/projects/{TEST_PROJECT_0}/styles")
-        self.assertTrue("style_line" in p.get_json())
-        self.assertTrue("style_fill" in p.get_json())
+        p = self.app.get(PROJECT_0_STYLES)
+        j = p.get_json()
+        self.assertTrue(style_line in j)
+        self.assertTrue(style_fill in j)
 
         # style line metadata
-        p = self.app.get(f"/api/projects/{TEST_PROJECT_0}/styles/style_line")
+        p = self.app.get(f"{PROJECT_0_STYLES}/{style_line}")
         j = p.get_json()
-        self.assertTrue(j["symbology"]["properties"]["line_width"], 0.75)
+        width = float(j["symbology"]["properties"]["line_width"])
+        self.assertAlmostEqual(width, 0.5)
 
         # style fill metadata
-        p = self.app.get(f"/api/projects/{TEST_PROJECT_0}/styles/style_fill")
+        p = self.app.get(f"{PROJECT_0_STYLES}/{style_fill}")
         j = p.get_json()
-        self.assertTrue(j["symbology"]["properties"]["outline_width"], 0.75)
+        width = float(j["symbology"]["properties"]["outline_width"])
+        self.assertAlmostEqual(width, 0.5)
 
         # add layers
-        data = {}
-        data["name"] = "layer0"
-        data["datasource"] = f"{GPKG}|layername=polygons"
-        data["crs"] = 4326
-        data["type"] = "vector"
-        p = self.app.post(f"/api/projects/{TEST_PROJECT_0}/layers", data)
+        data = {**LAYER_POLYGONS, "name": layer0, "crs": 4326}
+        p = self.app.post(PROJECT_0_LAYERS, data)
         self.assertEqual(p.status_code, 201)
 
-        data = {}
-        data["name"] = "layer1"
-        data["datasource"] = f"{GPKG}|layername=lines"
-        data["crs"] = 32637
-        data["type"] = "vector"
-        p = self.app.post(f"/api/projects/{TEST_PROJECT_0}/layers", data)
+        data = {**LAYER_LINES, "name": layer1, "crs": 32637}
+        p = self.app.post(PROJECT_0_LAYERS, data)
         self.assertEqual(p.status_code, 201)
 
         # add style to layers
         data = {}
         data["current"] = False
-        data["name"] = "style_fill"
-        p = self.app.post(
-            f"/api/projects/{TEST_PROJECT_0}/layers/layer0/style", data
-        )
+        data["name"] = style_fill
+        p = self.app.post(f"{PROJECT_0_LAYERS}/{layer0}/style", data)
         self.assertEqual(p.status_code, 201)
 
         data = {}
         data["current"] = True
-        data["name"] = "style_line"
-        p = self.app.post(
-            f"/api/projects/{TEST_PROJECT_0}/layers/layer1/style", data
-        )
+        data["name"] = style_line
+        p = self.app.post(f"{PROJECT_0_LAYERS}/{layer1}/style", data)
         self.assertEqual(p.status_code, 201)
 
         # check style for layers
-        p = self.app.get(f"/api/projects/{TEST_PROJECT_0}/layers/layer0")
+        p = self.app.get(f"{PROJECT_0_LAYERS}/{layer0}")
         j = p.get_json()
-        self.assertEqual(j["styles"], ["default", "style_fill"])
+        self.assertEqual(j["styles"], ["default", style_fill])
         self.assertEqual(j["current_style"], "default")
 
-        p = self.app.get(f"/api/projects/{TEST_PROJECT_0}/layers/layer1")
+        p = self.app.get(f"{PROJECT_0_LAYERS}/{layer1}")
         j = p.get_json()
-        self.assertEqual(j["styles"], ["default", "style_line"])
-        self.assertEqual(j["current_style"], "style_line")
+        self.assertEqual(j["styles"], ["default", style_line])
+        self.assertEqual(j["current_style"], style_line)
 
         # remove style
-        p = self.app.delete(
-            f"/api/projects/{TEST_PROJECT_0}/styles/style_fill"
-        )
+        p = self.app.delete(f"{PROJECT_0_STYLES}/{style_fill}")
         self.assertEqual(p.status_code, 201)
 
         # 1 style
-        p = self.app.get(f"/api/projects/{TEST_PROJECT_0}/styles")
-        self.assertEqual(p.get_json(), ["style_line"])
-
-        # remove last project
-        p = self.app.delete(f"/api/projects/{TEST_PROJECT_0}")
+        p = self.app.get(PROJECT_0_STYLES)
+        self.assertEqual(self.own(p.get_json()), [style_line])
 
     def test_default_style(self):
-        # add project
+        # default styles are shared by all layers of a project, so a
+        # dedicated project is used
         data = {}
-        data["name"] = TEST_PROJECT_0
+        data["name"] = TEST_PROJECT_1
         data["author"] = "pblottiere"
         data["storage"] = "filesystem"
         p = self.app.post("/api/projects/", data)
         self.assertEqual(p.status_code, 201)
+        # removed even if the test fails, not to leak into test_projects
+        self.addCleanup(self.remove_project, PROJECT_1)
 
         # default styles
-        p = self.app.get(f"/api/projects/{TEST_PROJECT_0}/styles/default")
+        p = self.app.get(f"{PROJECT_1_STYLES}/default")
         self.assertEqual(
             p.get_json(),
             {
@@ -404,6 +359,8 @@ class APITestCaseFilesystem(unittest.TestCase):
             },
         )
 
+        styles = []
+
         # add line style to project
         data = {}
         data["type"] = "vector"
@@ -417,8 +374,7 @@ class APITestCaseFilesystem(unittest.TestCase):
             "outline_color": "#0055FF",
         }
         data["rendering"] = {}
-        p = self.app.post(f"/api/projects/{TEST_PROJECT_0}/styles", data)
-        self.assertEqual(p.status_code, 201)
+        styles.append(data)
 
         # add fill style to project
         data = {}
@@ -433,8 +389,7 @@ class APITestCaseFilesystem(unittest.TestCase):
             "outline_color": "#002222",
         }
         data["rendering"] = {}
-        p = self.app.post(f"/api/projects/{TEST_PROJECT_0}/styles", data)
-        self.assertEqual(p.status_code, 201)
+        styles.append(data)
 
         # add marker style to project
         data = {}
@@ -444,12 +399,18 @@ class APITestCaseFilesystem(unittest.TestCase):
         data["symbology"]["properties"] = {
             "color": "#00BBBB",
             "name": "star",
+            "symbol_path": "symbol/star.svg",
             "size": 6,
             "angle": 45,
         }
         data["rendering"] = {}
-        p = self.app.post(f"/api/projects/{TEST_PROJECT_0}/styles", data)
-        self.assertEqual(p.status_code, 201)
+        styles.append(data)
+
+        # styles are independent files
+        ps = self.app.post_many(PROJECT_1_STYLES, styles, concurrent=True)
+        self.assertEqual([p.status_code for p in ps], [201] * len(ps))
+
+        defaults = []
 
         # set default styles for polygons/fill symbol
         data = {}
@@ -457,10 +418,7 @@ class APITestCaseFilesystem(unittest.TestCase):
         data["geometry"] = "polygon"
         data["symbol"] = "fill"
         data["style"] = "style_fill"
-        p = self.app.post(
-            f"/api/projects/{TEST_PROJECT_0}/styles/default", data
-        )
-        self.assertEqual(p.status_code, 201)
+        defaults.append(data)
 
         # set default styles for line/line symbol
         data = {}
@@ -468,10 +426,7 @@ class APITestCaseFilesystem(unittest.TestCase):
         data["geometry"] = "line"
         data["symbol"] = "line"
         data["style"] = "style_line"
-        p = self.app.post(
-            f"/api/projects/{TEST_PROJECT_0}/styles/default", data
-        )
-        self.assertEqual(p.status_code, 201)
+        defaults.append(data)
 
         # set default styles for point/marker symbol
         data = {}
@@ -479,13 +434,16 @@ class APITestCaseFilesystem(unittest.TestCase):
         data["geometry"] = "point"
         data["symbol"] = "marker"
         data["style"] = "style_marker"
-        p = self.app.post(
-            f"/api/projects/{TEST_PROJECT_0}/styles/default", data
+        defaults.append(data)
+
+        # default styles are independent rows
+        ps = self.app.post_many(
+            f"{PROJECT_1_STYLES}/default", defaults, concurrent=True
         )
-        self.assertEqual(p.status_code, 201)
+        self.assertEqual([p.status_code for p in ps], [201] * len(ps))
 
         # check default style
-        p = self.app.get(f"/api/projects/{TEST_PROJECT_0}/styles/default")
+        p = self.app.get(f"{PROJECT_1_STYLES}/default")
         self.assertEqual(
             p.get_json(),
             {
@@ -495,72 +453,110 @@ class APITestCaseFilesystem(unittest.TestCase):
             },
         )
 
-        # add layer
-        data = {}
-        data["name"] = "layer0"
-        data["datasource"] = f"{GPKG}|layername=polygons"
-        data["crs"] = 4326
-        data["type"] = "vector"
-        p = self.app.post(f"/api/projects/{TEST_PROJECT_0}/layers", data)
-        self.assertEqual(p.status_code, 201)
+        # add layers
+        layers = []
 
-        data = {}
-        data["name"] = "layer1"
-        data["datasource"] = f"{GPKG}|layername=lines"
-        data["crs"] = 4326
-        data["type"] = "vector"
-        p = self.app.post(f"/api/projects/{TEST_PROJECT_0}/layers", data)
-        self.assertEqual(p.status_code, 201)
+        data = {**LAYER_POLYGONS, "name": "layer0", "crs": 4326}
+        layers.append(data)
 
-        data = {}
-        data["name"] = "layer2"
-        data["datasource"] = f"{GPKG}|layername=points"
-        data["crs"] = 4326
-        data["type"] = "vector"
-        p = self.app.post(f"/api/projects/{TEST_PROJECT_0}/layers", data)
+        data = {**LAYER_LINES, "name": "layer1", "crs": 4326}
+        layers.append(data)
+
+        data = {**LAYER_POINTS, "name": "layer2", "crs": 4326}
+        layers.append(data)
+
+        # each layer rewrites the QGIS project, so they are added one after
+        # the other by the server
+        p = self.app.post_batch(PROJECT_1_LAYERS, layers)
         self.assertEqual(p.status_code, 201)
 
         # check if default style is applied when adding a new layer in the project
-        p = self.app.get(f"/api/projects/{TEST_PROJECT_0}/layers/layer0")
+        p = self.app.get(f"{PROJECT_1_LAYERS}/layer0")
         j = p.get_json()
         self.assertEqual(j["styles"], ["default", "style_fill"])
         self.assertEqual(j["current_style"], "style_fill")
 
-        p = self.app.get(f"/api/projects/{TEST_PROJECT_0}/layers/layer1")
+        p = self.app.get(f"{PROJECT_1_LAYERS}/layer1")
         j = p.get_json()
         self.assertEqual(j["styles"], ["default", "style_line"])
         self.assertEqual(j["current_style"], "style_line")
 
         if not self.app.is_flask_client:
-            # save polygon layer as png
-            r = self.app.get(
-                f"/api/projects/{TEST_PROJECT_0}/layers/layer0/map"
-            )
-            with open(
-                f"/tmp/{TEST_PROJECT_0}_layer0_style_fill.png", "wb"
-            ) as out_file:
-                out_file.write(r.resp.content)
-
-            # save line layer as png
-            r = self.app.get(
-                f"/api/projects/{TEST_PROJECT_0}/layers/layer1/map"
-            )
-            with open(
-                f"/tmp/{TEST_PROJECT_0}_layer1_style_line.png", "wb"
-            ) as out_file:
-                out_file.write(r.resp.content)
-
-            # save point layer as png
-            r = self.app.get(
-                f"/api/projects/{TEST_PROJECT_0}/layers/layer2/map"
-            )
-            with open(
-                f"/tmp/{TEST_PROJECT_0}_layer2_style_marker.png", "wb"
-            ) as out_file:
-                out_file.write(r.resp.content)
+            # render maps concurrently and save them as png
+            maps = {
+                "layer0": "style_fill",
+                "layer1": "style_line",
+                "layer2": "style_marker",
+            }
+
+            def save_map(layer):
+                r = self.app.get(
+                    f"{PROJECT_1_LAYERS}/{layer}/map",
+                    stream=True,
+                )
+                with open(
+                    f"/tmp/{TEST_PROJECT_1}_{layer}_{maps[layer]}.png", "wb"
+                ) as out_file:
+                    for chunk in r.iter_content(65536):
+                        out_file.write(chunk)
+
+            with ThreadPoolExecutor(max_workers=len(maps)) as executor:
+                list(executor.map(save_map, maps))
+
+
+class APITestCaseSymbology(unittest.TestCase):
+    # symbology properties don't depend on any project
+    @classmethod
+    def setUpClass(cls):
+        cls.app = TestClient(PROJECTS_DIR)
+
+    def test_vector_symbology_line(self):
+        # access symbol properties
+        p = self.app.get(
+            "/api/symbology/vector/line/single_symbol/line/properties"
+        )
+        j = p.get_json()
+        self.assertTrue("line_width" in j)
 
-        # remove last project
-        p = self.app.delete(f"/api/projects/{TEST_PROJECT_0}")
+    def test_vector_symbology_fill(self):
+        # list symbology for fill geometries
+        p = self.app.get(
+            "/api/symbology/vector/polygon/single_symbol/fill/properties"
+        )
+        j = p.get_json()
+        self.assertTrue("outline_style" in j)
+
+    def test_vector_symbology_marker(self):
+        # list symbology for marker geometries
+        p = self.app.get(
+            "/api/symbology/vector/point/single_symbol/marker/properties"
+        )
+        j = p.get_json()
+        self.assertTrue("outline_style" in j)
+
+    def test_vector_symbology_rendering(self):
+        p = self.app.get("/api/symbology/vector/rendering/properties")
+        j = p.get_json()
+        self.assertTrue("opacity" in j)
+
+    def test_raster_symbology_rendering(self):
+        p = self.app.get("/api/symbology/raster/rendering/properties")
+        j = p.get_json()
+        self.assertTrue("gamma" in j)
+        self.assertTrue("brightness" in j)
+        self.assertTrue("contrast" in j)
+        self.assertTrue("saturation" in j)
+
+    def test_raster_symbology_singlebandgray(self):
+        p = self.app.get("/api/symbology/raster/singlebandgray/properties")
+        j = p.get_json()
+        self.assertTrue("gray" in j)
+        self.assertTrue("contrast_enhancement" in j)
+
+    def test_raster_symbology_multibandcolor(self):
+        p = self.app.get("/api/symbology/raster/multibandcolor/properties")
+        j = p.get_json()
+        self.assertTrue("contrast_enhancement" in j)
 
 
 if __name__ == "__main__":
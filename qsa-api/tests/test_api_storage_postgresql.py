@@ -2,7 +2,12 @@ import os
 import unittest
 from pathlib import Path
 
-from .utils import TestClient
+from .utils import (
+    TestClient,
+    PROJECTS_DIR,
+    TEST_PROJECT_0,
+    TEST_PROJECT_1,
+)
 
 GPKG = Path(__file__).parent / "data.gpkg"
 if "QSA_GPKG" in os.environ:
@@ -12,19 +17,32 @@ GEOTIFF = Path(__file__).parent / "landsat_4326.tif"
 if "QSA_GEOTIFF" in os.environ:
     GEOTIFF = os.environ["QSA_GEOTIFF"]
 
-TEST_PROJECT_0 = "qsa_test_project0"
-TEST_PROJECT_1 = "qsa_test_project1"
+# layer definitions, completed with a name and a CRS by tests
+LAYER_POLYGONS = {
+    "datasource": f"{GPKG}|layername=polygons",
+    "type": "vector",
+}
+LAYER_LINES = {"datasource": f"{GPKG}|layername=lines", "type": "vector"}
+LAYER_POINTS = {"datasource": f"{GPKG}|layername=points", "type": "vector"}
+LAYER_RASTER = {"datasource": f"{GEOTIFF}", "type": "raster"}
+
+# API URLs of test projects
+PROJECT_0 = f"/api/projects/{TEST_PROJECT_0}"
+PROJECT_0_LAYERS = f"{PROJECT_0}/layers"
+PROJECT_1 = f"/api/projects/{TEST_PROJECT_1}"
 
 
 class APITestCasePostgresql(unittest.TestCase):
-    def setUp(self):
-        self.app = TestClient("/tmp/qsa/projects/qgis", "qsa_test")
+    @classmethod
+    def setUpClass(cls):
+        cls.app = TestClient(PROJECTS_DIR, "qsa_test")
 
     def test_projects(self):
         # no projects
         p = self.app.get("/api/projects/")
-        self.assertTrue(TEST_PROJECT_0 not in p.get_json())
-        self.assertTrue(TEST_PROJECT_1 not in p.get_json())
+        j = p.get_json()
+        self.assertTrue(TEST_PROJECT_0 not in j)
+        self.assertTrue(TEST_PROJECT_1 not in j)
 
         # add projects
         data = {}
@@ -34,18 +52,19 @@ class APITestCasePostgresql(unittest.TestCase):
         self.assertEqual(p.status_code, 201)
 
         data = {}
-        data["name"] = "qsa_test_project1"
+        data["name"] = TEST_PROJECT_1
         data["author"] = "pblottiere"
         p = self.app.post("/api/projects/", data)
         self.assertEqual(p.status_code, 201)
 
         # 2 projects
         p = self.app.get("/api/projects/")
-        self.assertTrue(TEST_PROJECT_0 in p.get_json())
-        self.assertTrue(TEST_PROJECT_1 in p.get_json())
+        j = p.get_json()
+        self.assertTrue(TEST_PROJECT_0 in j)
+        self.assertTrue(TEST_PROJECT_1 in j)
 
         # remove project
-        p = self.app.delete(f"/api/projects/{TEST_PROJECT_0}")
+        p = self.app.delete(PROJECT_0)
         self.assertEqual(p.status_code, 201)
 
         # 1 projects
@@ -53,7 +72,7 @@ class APITestCasePostgresql(unittest.TestCase):
         self.assertTrue(TEST_PROJECT_1 in p.get_json())
 
         # get info about project
-        p = self.app.get(f"/api/projects/{TEST_PROJECT_1}")
+        p = self.app.get(PROJECT_1)
         j = p.get_json()
         self.assertTrue("crs" in j)
         self.assertTrue("creation_datetime" in j)
@@ -63,7 +82,7 @@ class APITestCasePostgresql(unittest.TestCase):
         self.assertEqual(j["crs"], "EPSG:3857")
 
         # remove last project
-        p = self.app.delete(f"/api/projects/{TEST_PROJECT_1}")
+        p = self.app.delete(PROJECT_1)
 
     def test_layers(self):
         # add project
@@ -74,47 +93,31 @@ class APITestCasePostgresql(unittest.TestCase):
         self.assertEqual(p.status_code, 201)
 
         # 0 layer
-        p = self.app.get(f"/api/projects/{TEST_PROJECT_0}/layers")
+        p = self.app.get(PROJECT_0_LAYERS)
         self.assertEqual(p.get_json(), [])
 
         # add layer
-        data = {}
-        data["name"] = "layer0"
-        data["datasource"] = f"{GPKG}|layername=polygons"
-        data["crs"] = 4326
-        data["type"] = "vector"
-        p = self.app.post(f"/api/projects/{TEST_PROJECT_0}/layers", data)
+        data = {**LAYER_POLYGONS, "name": "layer0", "crs": 4326}
+        p = self.app.post(PROJECT_0_LAYERS, data)
         self.assertEqual(p.status_code, 201)
 
-        data = {}
-        data["name"] = "layer1"
-        data["datasource"] = f"{GPKG}|layername=lines"
-        data["crs"] = 4326
-        data["type"] = "vector"
-        p = self.app.post(f"/api/projects/{TEST_PROJECT_0}/layers", data)
+        data = {**LAYER_LINES, "name": "layer1", "crs": 4326}
+        p = self.app.post(PROJECT_0_LAYERS, data)
         self.assertEqual(p.status_code, 201)
 
-        data = {}
-        data["name"] = "layer2"
-        data["datasource"] = f"{GPKG}|layername=points"
-        data["crs"] = 4326
-        data["type"] = "vector"
-        p = self.app.post(f"/api/projects/{TEST_PROJECT_0}/layers", data)
+        data = {**LAYER_POINTS, "name": "layer2", "crs": 4326}
+        p = self.app.post(PROJECT_0_LAYERS, data)
         self.assertEqual(p.status_code, 201)
 
-        data = {}
-        data["name"] = "layer3"
-        data["datasource"] = f"{GEOTIFF}"
-        data["crs"] = 4326
-        data["type"] = "raster"
-        p = self.app.post(f"/api/projects/{TEST_PROJECT_0}/layers", data)
+        data = {**LAYER_RASTER, "name": "layer3", "crs": 4326}
+        p = self.app.post(PROJECT_0_LAYERS, data)
         self.assertEqual(p.status_code, 201)
 
         # 3 layers
-        p = self.app.get(f"/api/projects/{TEST_PROJECT_0}/layers")
+        p = self.app.get(PROJECT_0_LAYERS)
         self.assertEqual(
             p.get_json(), ["layer0", "layer1", "layer2", "layer3"]
         )
 
         # remove last project
-        p = self.app.delete(f"/api/projects/{TEST_PROJECT_0}")
+        p = self.app.delete(PROJECT_0)
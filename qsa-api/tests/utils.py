@@ -2,15 +2,55 @@ import os
 import json
 import shutil
 import requests
+from requests.adapters import HTTPAdapter
 from flask import Flask
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# pytest-xdist worker, so that parallel runs don't share projects
+WORKER = os.environ.get("PYTEST_XDIST_WORKER", "gw0")
+
+
+def is_tmpfs(path):
+    # file system of the deepest mount point containing path
+    fstype = ""
+    mountpoint = ""
+    try:
+        with open("/proc/mounts") as mounts:
+            for line in mounts:
+                fields = line.split()
+                mnt = fields[1]
+                if (
+                    os.path.commonpath([path, mnt]) == mnt
+                    and len(mnt) > len(mountpoint)
+                ):
+                    mountpoint, fstype = mnt, fields[2]
+    except (OSError, ValueError, IndexError):
+        return False
+    return fstype == "tmpfs"
+
+
+# projects are written on almost every request, so they are kept in memory
+# when /tmp is backed by a disk
+PROJECTS_ROOT = "/tmp/qsa/projects"
+if "QSA_TEST_PROJECTS_ROOT" in os.environ:
+    PROJECTS_ROOT = os.environ["QSA_TEST_PROJECTS_ROOT"]
+elif not is_tmpfs("/tmp") and os.access("/dev/shm", os.W_OK):
+    PROJECTS_ROOT = "/dev/shm/qsa/projects"
+
+PROJECTS_DIR = f"{PROJECTS_ROOT}/{WORKER}/qgis"
+
+TEST_PROJECT_0 = f"qsa_test_project0_{WORKER}"
+TEST_PROJECT_1 = f"qsa_test_project1_{WORKER}"
 
 app = Flask(__name__)
 
 from qsa_api.config import QSAConfig
+from qsa_api.utils import QSAJSONProvider
 from qsa_api.api.projects import projects
 from qsa_api.api.symbology import symbology
 
+app.json = QSAJSONProvider(app)
 app.register_blueprint(projects, url_prefix="/api/projects")
 app.register_blueprint(symbology, url_prefix="/api/symbology")
 
@@ -19,15 +59,31 @@ class TestResponse:
     def __init__(self, resp, flask_client):
         self.flask_client = flask_client
         self.resp = resp
+        self._json = None
 
     @property
     def status_code(self):
         return self.resp.status_code
 
+    @property
+    def text(self):
+        if self.flask_client:
+            return self.resp.get_data(as_text=True)
+        return self.resp.text
+
     def get_json(self):
+        # body is decoded once, whatever the number of assertions
+        if self._json is None:
+            if self.flask_client:
+                self._json = self.resp.get_json()
+            else:
+                self._json = self.resp.json()
+        return self._json
+
+    def iter_content(self, chunk_size):
         if self.flask_client:
-            return self.resp.get_json()
-        return self.resp.json()
+            return self.resp.iter_encoded()
+        return self.resp.iter_content(chunk_size)
 
 
 class TestClient:
@@ -51,7 +107,7 @@ class TestClient:
             self.app.application.config["DEBUG"] = True
 
             # clear projects dir
-            tmpdir = Path("/tmp/qsa/projects")
+            tmpdir = Path(projects_dir).parent
             shutil.rmtree(tmpdir, ignore_errors=True)
 
             (tmpdir / "qgis").mkdir(parents=True, exist_ok=True)
@@ -61,6 +117,12 @@ class TestClient:
             port = os.environ["QSA_PORT"]
             self._url = f"http://{host}:{port}"
 
+            # keep-alive connection to the QSA server
+            self.app = requests.Session()
+            self.app.mount(
+                "http://", HTTPAdapter(pool_connections=1, pool_maxsize=4)
+            )
+
             self.delete(f"/api/projects/{TEST_PROJECT_0}")
             self.delete(f"/api/projects/{TEST_PROJECT_1}")
 
@@ -79,12 +141,38 @@ class TestClient:
             )
         return TestResponse(r, self.is_flask_client)
 
+    def post_batch(self, url, items):
+        r = self.post(f"{url}:batch", {"items": items})
+        if self.is_flask_client or r.status_code not in (404, 405):
+            return r
+
+        # remote server older than batch routes
+        for data in items:
+            r = self.post(url, data)
+            if r.status_code != 201:
+                break
+        return r
+
+    def post_many(self, url, items, concurrent=False):
+        # only against a remote server: the Flask client would run QGIS in
+        # several threads of the test process
+        if concurrent and not self.is_flask_client:
+            with ThreadPoolExecutor(max_workers=len(items)) as executor:
+                return list(
+                    executor.map(lambda data: self.post(url, data), items)
+                )
+        return [self.post(url, data) for data in items]
+
     def delete(self, url):
         r = self.app.delete(self.url(url))
         return TestResponse(r, self.is_flask_client)
 
-    def get(self, url):
-        r = self.app.get(self.url(url))
+    def get(self, url, stream=False):
+        if self.is_flask_client:
+            r = self.app.get(self.url(url))
+        else:
+            # body is read with iter_content when streamed
+            r = self.app.get(self.url(url), stream=stream)
         return TestResponse(r, self.is_flask_client)
 
     def url(self, url) -> str: